@@ -101,6 +101,16 @@ class DryAnalytics(AbstractAnalytics):
     def print_performance(self):
         pass
 
+    def metrics(self):
+        """
+        Returns the running performance metrics published by the portfolio
+        """
+        return dict((name, float(value)) for name, value in self.redis.hgetall('metrics').items())
+
+    def print_metrics(self):
+        metrics = self.metrics()
+        print(tabulate(metrics.items(), headers=('Metric', 'Value')))
+
     def daily(self, n):
         """
         Shows profit or loss per day, over the last n days
@@ -32,6 +32,11 @@ parser.add_argument('-ot',
                     action='store_true',
                     help='Display current open trades')
 
+parser.add_argument('-m',
+                    '--metrics',
+                    action='store_true',
+                    help='Display current performance metrics')
+
 
 args = parser.parse_args()
 
@@ -64,3 +69,14 @@ if args.opentrades:
                 f'{symbol}: $ {current_value} (current value) – $ {open_price} (open price)')
     else:
         print('No open position.')
+
+if args.metrics:
+    r = redis.Redis(decode_responses=True)
+    metrics = r.hgetall('metrics')
+
+    if metrics:
+        print('Metrics:')
+        for name, value in metrics.items():
+            print(f'        - {name}: {float(value):.2f}')
+    else:
+        print('No metrics published yet.')
@@ -0,0 +1,109 @@
+import numpy as np
+
+from scipy.signal import lfilter
+
+
+def _by_history(function, matrix, timeperiod):
+    """
+    It applies function to the rows grouped by their number of leading NaNs, e.g. the left padding of the symbols
+    with a shorter history, so each row is seeded from its first valid values like TA-Lib
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    output = np.full(matrix.shape, np.nan)
+
+    valid = ~np.isnan(matrix)
+    starts = np.where(valid.any(axis=1), valid.argmax(axis=1), matrix.shape[1])
+
+    for start in np.unique(starts):
+        rows = starts == start
+        output[rows, start:] = function(matrix[rows, start:], timeperiod)
+
+    return output
+
+
+def ema(matrix, timeperiod=30):
+    """
+    It returns the exponential moving average of every row of a (symbols x window) matrix.
+    It is seeded with the simple average of the first timeperiod values, like TA-Lib EMA,
+    and the recursion runs along the time axis for all symbols at once.
+    """
+    return _by_history(_ema, matrix, timeperiod)
+
+
+def _ema(matrix, timeperiod):
+    output = np.full(matrix.shape, np.nan)
+
+    if matrix.shape[-1] < timeperiod:
+        return output
+
+    alpha = 2 / (timeperiod + 1)
+    seed = matrix[:, :timeperiod].mean(axis=1)
+
+    output[:, timeperiod - 1] = seed
+    output[:, timeperiod:], _ = lfilter(
+        [alpha], [1, alpha - 1], matrix[:, timeperiod:], axis=1, zi=((1 - alpha) * seed)[:, None])
+
+    return output
+
+
+def rsi(matrix, timeperiod=14):
+    """
+    It returns the Wilder's RSI of every row of a (symbols x window) matrix.
+    Average gains and losses are seeded with their simple average, like TA-Lib RSI.
+    """
+    return _by_history(_rsi, matrix, timeperiod)
+
+
+def _rsi(matrix, timeperiod):
+    output = np.full(matrix.shape, np.nan)
+
+    if matrix.shape[-1] <= timeperiod:
+        return output
+
+    deltas = np.diff(matrix, axis=1)
+    gains = np.clip(deltas, 0, None)
+    losses = np.clip(-deltas, 0, None)
+
+    alpha = 1 / timeperiod
+    smoothed = []
+    for values in (gains, losses):
+        seed = values[:, :timeperiod].mean(axis=1)
+        average = np.empty((matrix.shape[0], values.shape[1] - timeperiod + 1))
+        average[:, 0] = seed
+        average[:, 1:], _ = lfilter(
+            [alpha], [1, alpha - 1], values[:, timeperiod:], axis=1, zi=((1 - alpha) * seed)[:, None])
+        smoothed.append(average)
+
+    avg_gain, avg_loss = smoothed
+    total = avg_gain + avg_loss
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        output[:, timeperiod:] = np.where(
+            total == 0, 0.0, 100 * avg_gain / total)
+
+    return output
+
+
+def bbands(matrix, timeperiod=5, nbdevup=2, nbdevdn=2):
+    """
+    It returns the upper, middle and lower Bollinger Bands of every row of a (symbols x window) matrix.
+    The standard deviation is the population one, like TA-Lib BBANDS with a simple moving average.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    upper = np.full(matrix.shape, np.nan)
+    middle = np.full(matrix.shape, np.nan)
+    lower = np.full(matrix.shape, np.nan)
+
+    if matrix.shape[-1] < timeperiod:
+        return upper, middle, lower
+
+    windows = np.lib.stride_tricks.sliding_window_view(
+        matrix, timeperiod, axis=1)
+    mean = windows.mean(axis=2)
+    std = windows.std(axis=2)
+
+    middle[:, timeperiod - 1:] = mean
+    upper[:, timeperiod - 1:] = mean + nbdevup * std
+    lower[:, timeperiod - 1:] = mean - nbdevdn * std
+
+    return upper, middle, lower
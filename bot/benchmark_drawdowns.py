@@ -0,0 +1,74 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from performance import create_drawdowns
+
+
+def create_drawdowns_loop(pnl):
+    """
+    Previous bar-by-bar implementation of performance.create_drawdowns, kept as the benchmark reference
+    """
+    hwm = [0]
+
+    idx = pnl.index
+    drawdown = pd.Series(index=idx, dtype=float)
+    duration = pd.Series(index=idx, dtype=float)
+
+    for t in range(1, len(idx)):
+        hwm.append(max(hwm[t-1], pnl.iloc[t]))
+        drawdown.iloc[t] = (hwm[t]-pnl.iloc[t])
+        duration.iloc[t] = (
+            0 if drawdown.iloc[t] == 0 else duration.iloc[t-1]+1)
+
+    return drawdown, drawdown.max(), duration.max()
+
+
+def random_equity_curve(size):
+    index = pd.date_range('2017-01-01', periods=size, freq='30min')
+    returns = pd.Series(np.random.normal(0, 0.002, size), index=index)
+    returns.iloc[0] = np.nan
+
+    return (1.0 + returns).cumprod()
+
+
+def timeit(func, pnl):
+    start = time.perf_counter()
+    result = func(pnl)
+    return time.perf_counter() - start, result
+
+
+parser = argparse.ArgumentParser(
+    description="Benchmark the vectorized drawdowns against the previous loop")
+
+parser.add_argument('-s',
+                    '--sizes',
+                    type=int,
+                    nargs='+',
+                    default=[100000, 1000000],
+                    help='Equity curve sizes to benchmark')
+
+parser.add_argument('--skip-loop',
+                    action='store_true',
+                    help='Only time the vectorized version')
+
+
+args = parser.parse_args()
+
+for size in args.sizes:
+    pnl = random_equity_curve(size)
+
+    elapsed, (drawdown, max_dd, dd_duration) = timeit(create_drawdowns, pnl)
+    print(f'{size} points - vectorized: {elapsed:.4f}s')
+
+    if args.skip_loop:
+        continue
+
+    loop_elapsed, (loop_drawdown, loop_max_dd, loop_dd_duration) = timeit(
+        create_drawdowns_loop, pnl)
+    print(f'{size} points - loop: {loop_elapsed:.4f}s (x{loop_elapsed / elapsed:.0f})')
+
+    assert np.allclose(drawdown, loop_drawdown, equal_nan=True)
+    assert max_dd == loop_max_dd and dd_duration == loop_dd_duration
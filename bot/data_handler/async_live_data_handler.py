@@ -0,0 +1,194 @@
+from data_handler.live_data_handler import LiveDataHandler
+
+import numpy as np
+
+import asyncio
+import threading
+import time
+
+import ccxt.async_support as ccxt_async
+
+from helpers import load_config
+from fake_exchange import AsyncFakeExchange
+
+
+class TokenBucket:
+    """
+    TokenBucket shares a request rate between concurrent coroutines: each request takes a token,
+    tokens refill at rate per second up to capacity, and a request waits when the bucket is empty.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def __repr__(self):
+        return f'<TokenBucket: {self.rate} requests/s, {self.tokens:.1f} tokens>'
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens +
+                              (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncLiveDataHandler(LiveDataHandler):
+    """
+    AsyncLiveDataHandler fetches the bars of all symbols concurrently through the ccxt async API,
+    on an asyncio loop running in a background thread, so a cycle takes about one request latency
+    instead of one per symbol.
+
+    Every request (bars, order books, tickers, markets) takes a token from a bucket of 'rate_limit'
+    requests per second (config key, default 10), in place of the ccxt rate limiter which throttles
+    requests one at a time.
+    The latency from the fetch request of each symbol to the Market event is kept in fetch_latencies.
+    """
+
+    def __init__(self, events, symbol_list, timeframe, exchange=None):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name='async-live-data', daemon=True)
+        self.thread.start()
+
+        self.fetch_started = dict()
+
+        # Latencies in seconds from the fetch request of each symbol to the Market event of the latest cycles
+        self.fetch_latencies = dict()
+        self.latencies_window = 100
+
+        # The bucket is needed by the first fetch, made when the parent constructor runs
+        self.bucket = TokenBucket(load_config().get('rate_limit', 10))
+
+        super().__init__(events, symbol_list, timeframe, exchange)
+
+    def __repr__(self):
+        return '<AsyncLiveDataHandler>'
+
+    def __str__(self):
+        return f'AsyncLiveDataHandler from {self.exchange_id} with {self.timeframe} timeframe'
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def _throttled(self, coroutine_function, *args, **kwargs):
+        """
+        It waits for a token of the shared bucket, then sends the request
+        """
+        await self.bucket.acquire()
+        return await coroutine_function(*args, **kwargs)
+
+    def _create_exchange(self):
+        """
+        The async exchange has to be created in the loop it runs on
+        """
+        async def create():
+            if self.exchange_id == 'fake':
+                return AsyncFakeExchange(**{'symbols': self.config.get('symbol_list'),
+                                            **self.config['exchange'].get('fake', dict())})
+
+            exchange_class = getattr(ccxt_async, self.exchange_id)
+            return exchange_class({
+                'apiKey': self.exchange_api_key,
+                'secret': self.exchange_secret_key,
+                'timeout': 30000,
+                'enableRateLimit': False,
+            })
+
+        return self._run(create())
+
+    def _load_markets(self):
+        now = time.monotonic()
+
+        if self.markets_loaded_at is None or now - self.markets_loaded_at > self.markets_ttl:
+            self._run(self._throttled(self.exchange.load_markets, True))
+            self.markets_loaded_at = now
+
+    async def _fetch_symbol(self, symbol):
+        await self.bucket.acquire()
+        self.fetch_started[symbol] = time.monotonic()
+
+        return await self.exchange.fetch_ohlcv(
+            symbol, timeframe=self.timeframe, **self._fetch_params(symbol))
+
+    def _fetch_ohlcv(self, symbol, since=None, limit=None):
+        return self._run(self._throttled(
+            self.exchange.fetch_ohlcv, symbol, timeframe=self.timeframe, since=since, limit=limit))
+
+    async def _fetch_all(self):
+        return await asyncio.gather(*(self._fetch_symbol(symbol) for symbol in self.symbol_list),
+                                    return_exceptions=True)
+
+    def _load_symbol_data(self):
+        """
+        It fetches the bars of all symbols concurrently. A symbol whose request failed keeps its previous bars.
+        """
+        self._load_markets()
+        self.fetch_started = dict()
+
+        for symbol, new_bars in zip(self.symbol_list, self._run(self._fetch_all())):
+            if isinstance(new_bars, Exception):
+                print(f'Fetching {symbol} bars failed: {new_bars}')
+                self.fetch_started.pop(symbol, None)
+                continue
+
+            self._merge_bars(symbol, new_bars)
+
+    def update_bars(self):
+        super().update_bars()
+
+        now = time.monotonic()
+        for symbol, started in self.fetch_started.items():
+            latencies = self.fetch_latencies.setdefault(symbol, list())
+            latencies.append(now - started)
+            del latencies[:-self.latencies_window]
+
+    def latency_report(self):
+        """
+        It returns the p50, p95 and max fetch-to-event latencies of each symbol, in ms
+        """
+        report = dict()
+
+        for symbol, latencies in self.fetch_latencies.items():
+            latencies = np.array(latencies) * 1000
+            report[symbol] = {
+                'p50': np.percentile(latencies, 50),
+                'p95': np.percentile(latencies, 95),
+                'max': latencies.max()
+            }
+
+        return report
+
+    def _fetch_order_book(self, symbol):
+        return self._run(self._throttled(self.exchange.fetch_order_book, symbol))
+
+    def _fetch_tickers(self, symbols):
+        if self.exchange.has.get('fetchTickers'):
+            return self._run(self._throttled(self.exchange.fetch_tickers, symbols))
+
+        async def fetch():
+            tickers = await asyncio.gather(*(self._throttled(self.exchange.fetch_ticker, symbol)
+                                             for symbol in symbols))
+            return dict(zip(symbols, tickers))
+
+        return self._run(fetch())
+
+    def close(self, timeout=None):
+        """
+        It closes the exchange session and stops the background loop
+        """
+        super().close(timeout)
+
+        if hasattr(self.exchange, 'close'):
+            self._run(self.exchange.close())
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
@@ -23,6 +23,14 @@ class CSVDataHandler(DataHandler):
 
         self.symbol_data_weekly = dict()
 
+        # Aligned (symbols x bars) matrices of every OHLCV field, fed bar by bar through self.bar_index
+        self.bars_matrix = dict()
+        self.bars_datetime = None
+        self.bar_index = 0
+
+        # Max number of bars kept per symbol in self.latest_symbol_data, set by prime_bars()
+        self.buffer_size = None
+
         self.continue_backtest = True
 
         self._load_symbol_data()
@@ -64,27 +72,66 @@ class CSVDataHandler(DataHandler):
 
         for symbol in self.symbol_list:
             self.symbol_data[symbol] = self.symbol_data[symbol].reindex(
-                index=combined_symbol_index, method='pad', fill_value=0).itertuples(name='OHLCV')
+                index=combined_symbol_index, method='pad', fill_value=0)
+
+        for column in columns[1:]:
+            self.bars_matrix[column] = np.vstack(
+                [self.symbol_data[symbol][column].values for symbol in self.symbol_list])
+        self.bars_datetime = combined_symbol_index
+        self.bars_count = len(combined_symbol_index)
+
+        for symbol in self.symbol_list:
+            self.symbol_data[symbol] = self.symbol_data[symbol].itertuples(
+                name='OHLCV')
 
     def _get_new_bar(self, symbol):
         for bar in self.symbol_data[symbol]:
             yield bar
 
-    def update_bars(self):
+    def _push_latest_bars(self):
         """
-        It feeds the backtest with latest data in each iteration and trigger Market event.
-        It sets this data in self.latest_symbol_data.
-        If there is no data to feed the backtest, it raises an exception and the backtest stops.
+        It appends the next bar of every symbol to self.latest_symbol_data.
+        If there is no data left, the backtest is flagged to stop.
         """
         for symbol in self.symbol_list:
             try:
                 bar = next(self._get_new_bar(symbol))
             except StopIteration:
                 self.continue_backtest = False
+                return
             else:
                 if bar is not None:
                     self.latest_symbol_data[symbol].append(bar)
 
+                # Trim the buffer once it doubled, so it costs O(1) amortized per bar
+                if self.buffer_size and len(self.latest_symbol_data[symbol]) >= 2 * self.buffer_size:
+                    del self.latest_symbol_data[symbol][:-self.buffer_size]
+
+        self.bar_index += 1
+
+    def prime_bars(self, N):
+        """
+        It pre-rolls N-1 bars without firing Market events, so the first update_bars() gives N bars to the strategy.
+        Bars buffers are bounded to N bars.
+        """
+        if N <= 0:
+            return
+
+        self.buffer_size = N
+
+        for _ in range(N - 1):
+            if not self.continue_backtest:
+                break
+            self._push_latest_bars()
+
+    def update_bars(self):
+        """
+        It feeds the backtest with latest data in each iteration and trigger Market event.
+        It sets this data in self.latest_symbol_data.
+        If there is no data to feed the backtest, it raises an exception and the backtest stops.
+        """
+        self._push_latest_bars()
+
         # Fire Market Event that will be handled by the Strategy and Portfolio
         self.events.put(MarketEvent())
 
@@ -147,12 +194,55 @@ class CSVDataHandler(DataHandler):
                 return np.array([getattr(bar, 'Index') for bar in bars])
             return np.array([getattr(bar, value_type) for bar in bars])
 
+    def get_latest_bars_matrix(self, value_type, N=1):
+        """
+        It returns the latest N values (open, high, low, close or volume) of all symbols as a (symbols x N) matrix
+        Rows follow self.symbol_list and the matrix is a view on the preloaded data, nothing is copied
+        As all symbols share the same index, 'datetime' returns a single DatetimeIndex
+        """
+        start = max(self.bar_index - N, 0)
+
+        if value_type == 'datetime':
+            return self.bars_datetime[start:self.bar_index]
+        return self.bars_matrix[value_type][:, start:self.bar_index]
+
     def current_price(self, symbol):
         """
         It retuns latest close price
         """
         return self.get_latest_bar_value(symbol, 'close')
 
+    def current_prices(self, symbols=None):
+        """
+        It returns the latest close prices of symbols (default: symbol_list) as a np array
+        """
+        closes = self.bars_matrix['close'][:, self.bar_index - 1]
+
+        if symbols is None:
+            return closes
+        return closes[[self.symbol_list.index(symbol) for symbol in symbols]]
+
+    def get_conversion_series(self, pair):
+        """
+        It returns the close prices of a conversion pair (e.g. BTC-USDT) aligned with the bars as a np array,
+        so they can be looked up by self.bar_index
+        Bars before the first close of the pair use that first close
+        """
+        pair = '-'.join(pair.split('/'))
+
+        if pair in self.symbol_list:
+            return self.bars_matrix['close'][self.symbol_list.index(pair)]
+
+        csv_files_path = f'{Path().absolute()}/{self.csv_dir}'
+        columns = ['datetime', 'open', 'high', 'low', 'close', 'volume']
+
+        pair_data = pd.read_csv(f'{csv_files_path}/{pair}_{self.timeframe}.csv',
+                                header=None, index_col=0, names=columns)
+        pair_data.index = pd.to_datetime(pair_data.index, unit='ms')
+        pair_data = pair_data[~pair_data.index.duplicated()].sort_index()
+
+        return pair_data['close'].reindex(index=self.bars_datetime, method='pad').bfill().values
+
     def get_latest_bars_df(self, symbol, N=1):
         """
         It returns the latest bars data of a given symbol as a np array
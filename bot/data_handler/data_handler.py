@@ -45,6 +45,21 @@ class DataHandler(metaclass=ABCMeta):
         """
         raise NotImplementedError('Should implement get_n_bars_values()')
 
+    @abstractmethod
+    def get_latest_bars_matrix(self, val_type, N=1):
+        """
+        Returns the last N bar values of every symbol as a (symbols x N) matrix, ordered as symbol_list.
+        """
+        raise NotImplementedError('Should implement get_latest_bars_matrix()')
+
+    @abstractmethod
+    def prime_bars(self, N):
+        """
+        Pre-loads history without firing any MarketEvent, so the first update_bars() provides N bars.
+        It also sizes the per-symbol bars buffers from N.
+        """
+        raise NotImplementedError("Should implement prime_bars()")
+
     @abstractmethod
     def update_bars(self):
         """
@@ -61,9 +76,30 @@ class DataHandler(metaclass=ABCMeta):
         """
         raise NotImplementedError("Should implement current_price()")
 
+    @abstractmethod
+    def current_prices(self, symbols=None):
+        """
+        Returns the current prices of symbols (default: symbol_list) as a numpy array, snapshotted once per bar
+        """
+        raise NotImplementedError("Should implement current_prices()")
+
+    @abstractmethod
+    def get_conversion_series(self, pair):
+        """
+        Returns the close prices of a conversion pair aligned with the bars, or None if it must be priced live
+        """
+        raise NotImplementedError("Should implement get_conversion_series()")
+
     @abstractmethod
     def get_latest_bars_df(self):
         """
         Returns the current close price in Backtesting and current ask in live
         """
         raise NotImplementedError("Should implement get_latest_bars_df()")
+
+    def close(self, timeout=None):
+        """
+        Called when the run exits, to release what the handler holds (connections, buffered recordings).
+        Handlers holding nothing have nothing to do.
+        """
+        pass
@@ -7,28 +7,55 @@ from datetime import datetime
 import time
 
 import ccxt
-from ccxt.base.errors import RequestTimeout
 from event import MarketEvent
 
 import queue
 
-from helpers import load_config
+from helpers import load_config, timeframe_to_minutes
+from fake_exchange import FakeExchange
+from order_book import OrderBookRecorder
+from quote_cache import QuoteCache
 
 
 class LiveDataHandler(DataHandler):
-    def __init__(self, events, symbol_list, timeframe):
+    def __init__(self, events, symbol_list, timeframe, exchange=None):
         self.events = events
         self.config = load_config()
 
         self.exchange_id = self.config['exchange']['id']
         self.exchange_api_key = self.config['exchange']['key']
         self.exchange_secret_key = self.config['exchange']['secret']
-        self.exchange = self._create_exchange()
+        self.exchange = exchange or self._create_exchange()
 
         self.timeframe = timeframe
         self.symbol_list = symbol_list
         self.latest_symbol_data = dict()
 
+        # Prices of the current bar, fetched in batch by current_prices()
+        self.prices_snapshot = dict()
+
+        # Order books fetched by current_price() are recorded when the 'order_book_recorder' key is set
+        recorder = self.config.get('order_book_recorder')
+        self.order_book_recorder = OrderBookRecorder(
+            **recorder) if recorder is not None else None
+
+        # Top of book of each symbol, cached with the settings of the 'quote_cache' key (ttl, retries, backoff)
+        self.quote_cache = QuoteCache(
+            self._fetch_quote, **self.config.get('quote_cache', dict()))
+
+        # Number of bars fetched per symbol, set by prime_bars() from the strategy lookback
+        self.bars_limit = None
+
+        # Max number of bars kept per symbol when prime_bars() did not set bars_limit
+        self.buffer_size = 1000
+
+        # Max number of bars returned by a fetch_ohlcv request, longer histories are paged
+        self.ohlcv_limit = self.config.get('ohlcv_limit', 1000)
+
+        # Markets are reloaded once they are older than markets_ttl seconds
+        self.markets_ttl = self.config.get('markets_ttl', 3600)
+        self.markets_loaded_at = None
+
         self.continue_backtest = True
 
         self._load_symbol_data()
@@ -40,6 +67,12 @@ class LiveDataHandler(DataHandler):
         return f'LiveDataHandler from {self.exchange_id} with {self.timeframe} timeframe'
 
     def _create_exchange(self):
+        # The 'fake' exchange replays exchange_data offline, with the settings of the 'fake' key,
+        # listing the markets of the configured symbols
+        if self.exchange_id == 'fake':
+            return FakeExchange(**{'symbols': self.config.get('symbol_list'),
+                                   **self.config['exchange'].get('fake', dict())})
+
         exchange_class = getattr(ccxt, self.exchange_id)
         exchange = exchange_class({
             'apiKey': self.exchange_api_key,
@@ -49,16 +82,95 @@ class LiveDataHandler(DataHandler):
         })
         return exchange
 
+    def _load_markets(self):
+        now = time.monotonic()
+
+        if self.markets_loaded_at is None or now - self.markets_loaded_at > self.markets_ttl:
+            self.exchange.load_markets(True)
+            self.markets_loaded_at = now
+
     def _load_symbol_data(self):
-        self.exchange.load_markets(True)
+        """
+        It fetches the bars of each symbol since its latest one, the history only on the first fetch.
+        The latest bar, which was still forming, is replaced by its fetched update.
+        Requests are throttled by the exchange rate limiter.
+        """
+        self._load_markets()
+
+        for symbol in self.symbol_list:
+            self._merge_bars(symbol, self._fetch_ohlcv(
+                symbol, **self._fetch_params(symbol)))
+
+    def _fetch_ohlcv(self, symbol, since=None, limit=None):
+        return self.exchange.fetch_ohlcv(symbol, timeframe=self.timeframe, since=since, limit=limit)
+
+    def _fetch_params(self, symbol):
+        """
+        It returns the fetch_ohlcv parameters of symbol: the history limit on the first fetch, then its latest timestamp
+        """
+        bars = self.latest_symbol_data.get(symbol)
+        if not bars:
+            return {'limit': self.bars_limit}
+        return {'since': bars[-1][0]}
+
+    def _merge_bars(self, symbol, new_bars):
+        """
+        It merges fetched bars into the bounded buffer of symbol
+        """
+        bars = self.latest_symbol_data.get(symbol)
+
+        if not bars:
+            self.latest_symbol_data[symbol] = new_bars
+            return
+
+        if not new_bars:
+            return
+
+        while bars and bars[-1][0] >= new_bars[0][0]:
+            bars.pop()
+        bars.extend(new_bars)
+
+        # Trim the buffer once it doubled, so it costs O(1) amortized per bar
+        buffer_size = self.bars_limit or self.buffer_size
+        if len(bars) >= 2 * buffer_size:
+            del bars[:-buffer_size]
+
+    def prime_bars(self, N):
+        """
+        It sizes the history to N bars, the exchange already provides the history to pre-roll.
+        The bars fetched at initialization are kept, only the older ones are fetched, paging with since
+        as a request returns at most ohlcv_limit bars.
+        """
+        if N <= 0:
+            return
+
+        self.bars_limit = N
+        duration = timeframe_to_minutes(self.timeframe) * 60 * 1000
 
         for symbol in self.symbol_list:
-            self.latest_symbol_data[symbol] = self.exchange.fetch_ohlcv(
-                symbol, timeframe=self.timeframe)
-            # Wait a sec before sending a request
-            time.sleep(1)
+            bars = self.latest_symbol_data.get(symbol)
+            if not bars:
+                continue
+
+            since = bars[-1][0] - (N - 1) * duration
+            older = list()
+
+            while since < bars[0][0]:
+                page = [bar for bar in self._fetch_ohlcv(symbol, since=since, limit=self.ohlcv_limit)
+                        if bar[0] < bars[0][0]]
+                if not page:
+                    # The symbol was listed later
+                    break
+
+                older.extend(page)
+                since = page[-1][0] + duration
+
+            bars[:0] = older
+            del bars[:-N]
 
     def update_bars(self):
+        self.prices_snapshot = dict()
+        self.quote_cache.expire()
         self._load_symbol_data()
         self.events.put(MarketEvent())
 
@@ -133,19 +245,93 @@ class LiveDataHandler(DataHandler):
                                  for bar in bars])
             return np.array([bar[bars_map[value_type]] for bar in bars])
 
+    def get_latest_bars_matrix(self, value_type, N=1):
+        """
+        It returns the latest N values (open, high, low, close or volume) of all symbols as a (symbols x N) matrix
+        Rows follow self.symbol_list, symbols with less than N bars are left-padded with NaN
+        'datetime' returns the timestamps of the first symbol as a 1-D array
+        """
+        bars_map = {
+            'datetime': 0,
+            'open': 1,
+            'high': 2,
+            'low': 3,
+            'close': 4,
+            'volume': 5
+        }
+
+        if value_type == 'datetime':
+            return self.get_latest_bars_values(self.symbol_list[0], value_type, N=N)
+
+        matrix = np.full((len(self.symbol_list), N), np.nan)
+
+        for i, symbol in enumerate(self.symbol_list):
+            bars = np.array(self.latest_symbol_data[symbol][-N:], dtype=float)
+            if len(bars):
+                matrix[i, N - len(bars):] = bars[:, bars_map[value_type]]
+
+        return matrix
+
+    def current_quote(self, symbol):
+        """
+        It returns the cached top of book of symbol as a Quote, marked stale when it could not be refreshed,
+        None when symbol could never be quoted
+        """
+        return self.quote_cache.get(symbol)
+
     def current_price(self, symbol, side='asks'):
         """
-        It retuns current ask price
+        It retuns current ask (or bid) price, NaN when symbol could never be quoted
         """
-        counter = 2
-        try:
-            return self.exchange.fetch_order_book(symbol)[side][0][0]
-        except RequestTimeout:
-            if counter != 0:
-                self.current_price(symbol)
-                counter -= 1
-            else:
-                return 0
+        quote = self.current_quote(symbol)
+        if quote is None:
+            return np.nan
+        return quote.ask if side == 'asks' else quote.bid
+
+    def current_prices(self, symbols=None, side='ask'):
+        """
+        It returns the current ask prices of symbols (default: symbol_list) as a np array
+        Prices missing from the snapshot of the current bar are fetched in a single fetch_tickers request
+        """
+        symbols = self.symbol_list if symbols is None else symbols
+        missing = [symbol for symbol in symbols if symbol not in self.prices_snapshot]
+
+        if missing:
+            tickers = self._fetch_tickers(missing)
+
+            for symbol in missing:
+                ticker = tickers.get(symbol, dict())
+                self.prices_snapshot[symbol] = ticker.get(
+                    side) or ticker.get('last') or np.nan
+
+        return np.array([self.prices_snapshot[symbol] for symbol in symbols], dtype=float)
+
+    def _fetch_order_book(self, symbol):
+        return self.exchange.fetch_order_book(symbol)
+
+    def _fetch_quote(self, symbol):
+        order_book = self._fetch_order_book(symbol)
+        if self.order_book_recorder is not None:
+            self.order_book_recorder.record(symbol, order_book)
+        return order_book
+
+    def _fetch_tickers(self, symbols):
+        if self.exchange.has.get('fetchTickers'):
+            return self.exchange.fetch_tickers(symbols)
+        return dict((symbol, self.exchange.fetch_ticker(symbol)) for symbol in symbols)
+
+    def close(self, timeout=None):
+        """
+        It writes the order book snapshots still buffered
+        """
+        if self.order_book_recorder is not None:
+            self.order_book_recorder.flush()
+
+    def get_conversion_series(self, pair):
+        """
+        There is no preloaded series in live, conversion pairs are priced with current_prices()
+        """
+        return None
 
     def get_latest_bars_df(self, symbol, N=1):
         """
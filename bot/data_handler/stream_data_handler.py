@@ -0,0 +1,318 @@
+from data_handler.live_data_handler import LiveDataHandler
+
+import numpy as np
+
+import asyncio
+import json
+import queue
+import threading
+
+import ccxt
+import websockets
+
+from event import MarketEvent
+from helpers import load_config
+
+
+class StreamDataHandler(LiveDataHandler):
+    """
+    StreamDataHandler maintains the bars and the top of book of all symbols from the exchange WebSocket streams
+    instead of polling the REST API. It subscribes to the kline and bookTicker streams of every symbol, in the
+    Binance combined-stream format, on an asyncio loop running in a background thread.
+
+    The history is fetched once through REST, then only closed candles are appended to the bars, so the latest bar
+    is always the latest closed candle. update_bars() blocks until the next candle closed on all symbols,
+    or close_grace seconds after it closed on the first one, and fires its MarketEvent.
+
+    When the connection drops, it reconnects with an exponential backoff and backfills the candles closed meanwhile
+    through REST, a MarketEvent being fired for each of them.
+
+    Any stream error is logged and followed by a reconnect. While waiting for a candle, update_bars() checks every
+    health_interval seconds that the stream is still running, and raises the error which stopped it otherwise.
+
+    Settings are read from the 'stream' config key: url, close_grace, reconnect_delay, max_reconnect_delay
+    and health_interval.
+    """
+
+    default_urls = {
+        'binance': 'wss://stream.binance.com:9443/stream',
+        'fake': 'ws://localhost:8765/stream'
+    }
+
+    def __init__(self, events, symbol_list, timeframe, exchange=None, url=None):
+        stream_config = load_config().get('stream', dict())
+
+        self.close_grace = stream_config.get('close_grace', 2.0)
+        self.reconnect_delay = stream_config.get('reconnect_delay', 1.0)
+        self.max_reconnect_delay = stream_config.get('max_reconnect_delay', 60.0)
+        self.health_interval = stream_config.get('health_interval', 5.0)
+
+        # Shared by the loop thread, which receives the candles, and update_bars()
+        self.lock = threading.Lock()
+
+        # Closed candles received and not merged into the bars yet, and open timestamp of the latest closed candle
+        self.closed_bars = dict()
+        self.closed_until = dict()
+
+        # Best bid and ask of each symbol, as ccxt tickers
+        self.top_of_book = dict()
+
+        # Open timestamps of the candles whose MarketEvent is due, None once the stream is closed
+        self.candles = queue.Queue()
+        self.released_until = -1
+        self.grace_timers = dict()
+
+        self.reconnects = 0
+        self.streaming = True
+
+        super().__init__(events, symbol_list, timeframe, exchange)
+
+        self.url = url or stream_config.get('url') or self.default_urls.get(self.exchange_id)
+        self.stream_ids = dict((self._stream_id(symbol), symbol) for symbol in self.symbol_list)
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name='stream-data', daemon=True)
+        self.thread.start()
+        self.stream_task = asyncio.run_coroutine_threadsafe(
+            self._start(), self.loop).result()
+
+    def __repr__(self):
+        return '<StreamDataHandler>'
+
+    def __str__(self):
+        return f'StreamDataHandler from {self.exchange_id} with {self.timeframe} timeframe'
+
+    def _stream_id(self, symbol):
+        market = self.exchange.markets.get(symbol) if self.exchange.markets else None
+        return (market['id'] if market else ''.join(symbol.split('/'))).lower()
+
+    def _load_symbol_data(self):
+        """
+        It fetches the history of each symbol through REST, without its forming candle
+        """
+        self._load_markets()
+        limit = self.bars_limit + 1 if self.bars_limit else None
+
+        with self.lock:
+            for symbol in self.symbol_list:
+                bars = self.exchange.fetch_ohlcv(
+                    symbol, timeframe=self.timeframe, limit=limit)[:-1]
+
+                self.latest_symbol_data[symbol] = bars
+                self.closed_bars[symbol] = list()
+                self.closed_until[symbol] = bars[-1][0] if bars else -1
+
+            self.released_until = max(self.released_until, min(self.closed_until.values()))
+
+    async def _start(self):
+        return asyncio.ensure_future(self._stream())
+
+    async def _stop(self):
+        self.stream_task.cancel()
+        await asyncio.gather(self.stream_task, return_exceptions=True)
+
+    async def _stream(self):
+        """
+        It keeps the WebSocket connection open, reconnecting with an exponential backoff
+        """
+        streams = [f'{stream_id}@{stream}' for stream_id in self.stream_ids
+                   for stream in (f'kline_{self.timeframe}', 'bookTicker')]
+        delay = self.reconnect_delay
+
+        while self.streaming:
+            try:
+                async with websockets.connect(self.url) as websocket:
+                    await websocket.send(json.dumps({'method': 'SUBSCRIBE', 'params': streams, 'id': 1}))
+
+                    # Candles which closed before the subscription, e.g. while disconnected
+                    for timestamp in await self.loop.run_in_executor(None, self._backfill):
+                        self._candle_closed(timestamp)
+
+                    delay = self.reconnect_delay
+
+                    async for message in websocket:
+                        try:
+                            self._on_message(json.loads(message))
+                        except (KeyError, ValueError, TypeError, AttributeError) as e:
+                            print(f'Malformed stream message skipped ({e!r}): {message[:200]}')
+
+            except (OSError, asyncio.TimeoutError, websockets.ConnectionClosed, ccxt.NetworkError) as e:
+                print(f'Stream disconnected: {e}')
+            except Exception as e:
+                # e.g. a rejected handshake or a failed backfill, retried after the backoff too
+                print(f'Stream failed: {e!r}')
+
+            if not self.streaming:
+                break
+
+            print(f'Reconnecting to {self.url} in {delay}s')
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+            self.reconnects += 1
+
+    def _backfill(self):
+        """
+        It fetches through REST the candles closed since the latest one received of each symbol,
+        and returns the open timestamps of the new ones
+        """
+        closed = set()
+
+        for symbol in self.symbol_list:
+            since = self.closed_until[symbol]
+            bars = self.exchange.fetch_ohlcv(
+                symbol, timeframe=self.timeframe, since=since if since >= 0 else None)[:-1]
+
+            with self.lock:
+                for bar in bars:
+                    if bar[0] > self.closed_until[symbol]:
+                        self.closed_bars[symbol].append(bar)
+                        self.closed_until[symbol] = bar[0]
+                        closed.add(bar[0])
+
+        return sorted(closed)
+
+    def _on_message(self, message):
+        data = message.get('data', message)
+        symbol = self.stream_ids.get(str(data.get('s')).lower())
+        if symbol is None:
+            # e.g. the SUBSCRIBE response
+            return
+
+        if 'k' in data:
+            self._on_kline(symbol, data['k'])
+        elif 'b' in data and 'a' in data:
+            self.top_of_book[symbol] = {
+                'symbol': symbol,
+                'timestamp': data.get('E'),
+                'bid': float(data['b']),
+                'bidVolume': float(data['B']),
+                'ask': float(data['a']),
+                'askVolume': float(data['A'])
+            }
+
+    def _on_kline(self, symbol, kline):
+        """
+        Updates of the forming candle are skipped, a candle is only appended once closed
+        """
+        if not kline['x']:
+            return
+
+        bar = [kline['t'], float(kline['o']), float(kline['h']),
+               float(kline['l']), float(kline['c']), float(kline['v'])]
+
+        with self.lock:
+            if bar[0] <= self.closed_until[symbol]:
+                return
+            self.closed_bars[symbol].append(bar)
+            self.closed_until[symbol] = bar[0]
+
+        self._candle_closed(bar[0])
+
+    def _candle_closed(self, timestamp):
+        """
+        It releases the candle once closed on all symbols, or close_grace seconds after it closed on the first one
+        """
+        if timestamp <= self.released_until:
+            return
+
+        if min(self.closed_until.values()) >= timestamp:
+            self._release(timestamp)
+        elif timestamp not in self.grace_timers:
+            self.grace_timers[timestamp] = self.loop.call_later(
+                self.close_grace, self._release, timestamp)
+
+    def _release(self, timestamp):
+        """
+        It queues the MarketEvent of the candle opened at timestamp, and drops the timers of the earlier ones
+        """
+        if timestamp <= self.released_until:
+            return
+
+        self.released_until = timestamp
+        for pending in [t for t in self.grace_timers if t <= timestamp]:
+            self.grace_timers.pop(pending).cancel()
+
+        self.candles.put(timestamp)
+
+    def update_bars(self):
+        """
+        It waits for the next closed candle, appends it to the bars and fires its MarketEvent
+        """
+        while True:
+            try:
+                timestamp = self.candles.get(timeout=self.health_interval)
+                break
+            except queue.Empty:
+                self._check_stream()
+                if not self.continue_backtest:
+                    return
+
+        if timestamp is None:
+            self.continue_backtest = False
+            return
+
+        self.prices_snapshot = dict()
+
+        with self.lock:
+            for symbol in self.symbol_list:
+                pending = self.closed_bars[symbol]
+                closed = 0
+                while closed < len(pending) and pending[closed][0] <= timestamp:
+                    closed += 1
+
+                self._merge_bars(symbol, pending[:closed])
+                del pending[:closed]
+
+        self.events.put(MarketEvent())
+
+    def _check_stream(self):
+        """
+        It stops the run when the stream task has ended, raising the error which killed it
+        """
+        if not self.stream_task.done():
+            return
+
+        self.continue_backtest = False
+
+        error = None if self.stream_task.cancelled() else self.stream_task.exception()
+        if error is not None:
+            raise RuntimeError(f'The {self.url} stream stopped') from error
+
+        print(f'The {self.url} stream stopped')
+
+    def current_price(self, symbol, side='asks'):
+        """
+        It returns the best ask (or bid) of the stream, from the order book until the stream sent one
+        """
+        ticker = self.top_of_book.get(symbol)
+        if ticker is None:
+            return super().current_price(symbol, side)
+        return ticker[side[:-1]]
+
+    def current_prices(self, symbols=None, side='ask'):
+        """
+        It returns the best asks (or bids) of the stream, the symbols without one being fetched in batch
+        """
+        symbols = self.symbol_list if symbols is None else symbols
+        prices = np.array([self.top_of_book[symbol][side] if symbol in self.top_of_book else np.nan
+                           for symbol in symbols], dtype=float)
+
+        missing = [i for i, symbol in enumerate(symbols) if symbol not in self.top_of_book]
+        if missing:
+            prices[missing] = super().current_prices(
+                [symbols[i] for i in missing], side)
+
+        return prices
+
+    def close(self, timeout=None):
+        """
+        It closes the stream and unblocks update_bars(), which ends the engine loop
+        """
+        super().close(timeout)
+        self.streaming = False
+        asyncio.run_coroutine_threadsafe(self._stop(), self.loop).result(timeout)
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        self.candles.put(None)
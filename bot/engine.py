@@ -41,7 +41,13 @@ class Engine:
             self.portfolio
         )
 
-        self.execution_handler = ExecutionHandler(self.events)
+        self.execution_handler = ExecutionHandler(
+            self.events,
+            self.data_handler
+        )
+
+        # Pre-roll the history declared by the strategy, so no bar is wasted before the first signal
+        self.data_handler.prime_bars(self.stratagy.required_lookback())
 
         self.signals = 0
         self.orders = 0
@@ -90,6 +96,8 @@ class Engine:
                 else:
                     if event is not None:
                         if event.type == 'MARKET':
+                            # Fill the orders left pending at the previous bars
+                            self.execution_handler.update_fills()
                             # First update portoflio positions and holdings
                             self.portfolio.update_all_positions_holdings()
                             # Then, calculate indicators for each symbol using latest market and portfolio values
@@ -128,6 +136,21 @@ class Engine:
         print("Orders: %s" % self.orders)
         print("Fills: %s" % self.fills)
 
+    def _close(self):
+        """
+        It stops the background threads of the components once their pending work is done,
+        also when the run is interrupted
+        """
+        self.stratagy.close()
+        self.portfolio.close(timeout=10)
+        self.data_handler.close(timeout=10)
+
+        if hasattr(self.execution_handler, 'close'):
+            self.execution_handler.close(timeout=10)
+
     def start(self):
-        self._run()
-        self._output_performance()
+        try:
+            self._run()
+            self._output_performance()
+        finally:
+            self._close()
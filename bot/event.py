@@ -1,5 +1,7 @@
 from __future__ import print_function
 
+import itertools
+
 
 class Event:
     """
@@ -24,7 +26,7 @@ class SignalEvent(Event):
     Handles the event of sending a Signal from a Strategy object. This is received by a Portfolio object and acted upon.
     """
 
-    def __init__(self, *, strategy_id=1, symbol, datetime, signal_type, strength=1, indicators=None):
+    def __init__(self, *, strategy_id=1, symbol, datetime, signal_type, strength=1, indicators=None, order_type='MKT', price=None, oco_id=None):
         """
         Parameters:
             strategy_id: The unique identifier for the strategy that
@@ -38,6 +40,12 @@ class SignalEvent(Event):
 
             strength: An adjustment factor "suggestion" used to scale
             quantity at the portfolio level. Useful for pairs strategies.
+
+            order_type: 'MKT', or 'LMT', 'STP', 'TP' to rest the order until price is reached.
+
+            price: The limit, stop or take-profit price of a resting order.
+
+            oco_id: Resting orders of a symbol sharing an oco_id are One-Cancels-the-Other, e.g. a stop and a target.
         """
 
         self.type = 'SIGNAL'
@@ -47,15 +55,21 @@ class SignalEvent(Event):
         self.signal_type = signal_type
         self.strength = strength
         self.indicators = indicators
+        self.order_type = order_type
+        self.price = price
+        self.oco_id = oco_id
 
 
 class OrderEvent(Event):
     """
     Handles the event of sending an Order to an execution system.
     The order contains a symbol (e.g. ETH/BTC), a type (market or limit), quantity and a direction.
+    Each order gets a unique id, a 'CANCEL' order cancels the resting order of its order_id.
     """
 
-    def __init__(self, symbol, order_type, quantity, fill_cost, direction):
+    ids = itertools.count(1)
+
+    def __init__(self, symbol, order_type, quantity, fill_cost, direction, price=None, order_id=None, oco_id=None):
         """
         Initialises the order type, setting whether it is
         a Market order (’MKT’) or Limit order (’LMT’), has
@@ -64,9 +78,12 @@ class OrderEvent(Event):
 
         Parameters:
         symbol: The instrument to trade.
-        order_type: ’MKT’ or ’LMT’ for Market or Limit.
+        order_type: ’MKT’ or ’LMT’ for Market or Limit, ’STP’ or ’TP’ for Stop or Take-Profit, ’CANCEL’.
         quantity: Non-negative integer for quantity.
         direction: ’BUY’ or ’SELL’ for long or short.
+        price: The limit, stop or take-profit price of a resting order.
+        order_id: The id of the order to cancel, for a ’CANCEL’ order.
+        oco_id: The One-Cancels-the-Other group of a resting order, the first one filled cancels the others.
         """
 
         self.type = 'ORDER'
@@ -75,6 +92,10 @@ class OrderEvent(Event):
         self.quantity = quantity
         self.direction = direction
         self.fill_cost = fill_cost
+        self.price = price
+        self.order_id = order_id if order_id is not None else next(
+            OrderEvent.ids)
+        self.oco_id = oco_id
 
     def print_order(self):
         """
@@ -93,7 +114,7 @@ class FillEvent(Event):
     the commission of the trade from the exchange
     """
 
-    def __init__(self, timeindex, symbol, exchange, quantity, direction, fill_cost):
+    def __init__(self, timeindex, symbol, exchange, quantity, direction, fill_cost, fees_rate=0.0, order_id=None, status='FILLED'):
         """       
         Parameters:
             timeindex: The bar-resolution when the order was filled.
@@ -102,7 +123,9 @@ class FillEvent(Event):
             quantity: The filled quantity.
             direction: The direction of fill (’BUY’ or ’SELL’)
             fill_cost: The holdings value in dollars.
-            fees: An optional commission sent from the exchange
+            fees_rate: An optional commission rate of the exchange, applied to the filled value
+            order_id: The order_id of the filled OrderEvent, when known.
+            status: 'FILLED', or 'REJECTED' when the order will never be filled (quantity 0)
         """
 
         self.type = 'FILL'
@@ -112,5 +135,7 @@ class FillEvent(Event):
         self.quantity = quantity
         self.direction = direction
         self.fill_cost = fill_cost
-        self.fees_rate = 0.0
+        self.fees_rate = fees_rate
         self.fees = self.fees_rate * self.fill_cost * self.quantity
+        self.order_id = order_id
+        self.status = status
@@ -3,9 +3,23 @@ from abc import ABCMeta, abstractmethod
 
 from datetime import datetime
 
+import asyncio
+import threading
+import uuid
+
+import numpy as np
 import queue
 
+import ccxt
+import ccxt.async_support as ccxt_async
+
 from event import FillEvent
+from helpers import load_config
+from fake_exchange import AsyncFakeExchange
+from order_manager import OrderManager
+from intrabar import IntrabarResolver
+from order_book import OrderBookReplay
+from valuation import split_symbol
 
 
 class ExecutionHandler(metaclass=ABCMeta):
@@ -26,53 +40,580 @@ class ExecutionHandler(metaclass=ABCMeta):
         """
         raise NotImplementedError("Should implement execute_order()")
 
+    def update_fills(self):
+        """
+        Called on each new bar, before the portfolio and the strategy, to fill the orders left pending.
+        Handlers filling every order at once have nothing to do.
+        """
+        pass
+
 
 class SimulatedExecutionHandler(ExecutionHandler):
     """
-    The simulated execution handler simply converts all order objects into their equivalent fill objects automatically without latency, slippage or fill-ratio issues.
-    This allows a straightforward "first go" test of any strategy, before implementation with a more sophisticated execution handler.
+    The simulated execution handler converts order objects into their equivalent fill objects, with the costs set by
+    the 'execution' config key:
+        - fill_price: 'close' fills at the order fill_cost, i.e. the close of the signal bar in backtests,
+          'next_open' at the open of the next bar.
+        - max_participation: max fraction of the bar volume filled per bar. The rest of the order stays pending
+          and is filled at the open of the next bars, producing partial fills.
+        - spread: bid/ask spread as a fraction of the price, half of it is paid on each fill.
+        - slippage: fixed slippage as a fraction of the price.
+        - impact: market impact coefficient, the price moves by impact * sqrt(quantity / bar volume).
+        - exchange, fees_rate: the exchange whose fee schedule applies, or an explicit fees rate.
+        - intrabar_timeframe: lower timeframe (e.g. '30m') whose bars order the resting orders triggered within a bar.
+    Without the key, orders are filled at once at the close of the signal bar, without fees, spread nor slippage.
+
+    Limit, stop and take-profit orders rest in an OrderManager, and are filled at the bar their price is crossed.
+
+    Prices and volumes are read from the latest column of the data handler bars matrices,
+    so each fill costs O(1) whatever the length of the backtest.
     """
 
-    def __init__(self, events):
+    # Taker fees of each exchange
+    fee_schedules = {
+        'binance': 0.001,
+        'bitfinex': 0.002,
+        'bittrex': 0.0025,
+        'coinbasepro': 0.005,
+        'kraken': 0.0026,
+        'poloniex': 0.0009
+    }
+
+    # Directions taking the ask side of the book
+    buy_directions = ('BUY', 'SHORTCOVER')
+
+    def __init__(self, events, data_handler=None):
         """
         Initialises the handler, setting the event queues up internally.
         Parameters:
           events: The Queue of Event objects.
+          data_handler: The DataHandler providing the bars to fill orders on. Without it, orders are filled at their fill_cost.
         """
         self.events = events
+        self.data_handler = data_handler
+        self.config = load_config()
+
+        execution = self.config.get('execution', dict())
+
+        self.fill_price = execution.get('fill_price', 'close')
+        self.max_participation = execution.get('max_participation')
+        self.spread = execution.get('spread', 0.0)
+        self.slippage = execution.get('slippage', 0.0)
+        self.impact = execution.get('impact', 0.0)
+
+        self.exchange = execution.get('exchange', 'binance')
+        self.fees_rate = execution.get(
+            'fees_rate', self.fee_schedules.get(self.exchange, 0.0) if execution else 0.0)
+
+        if self.fill_price not in ('close', 'next_open'):
+            raise ValueError(f'Unknown fill price: {self.fill_price}')
+
+        if self.data_handler is not None:
+            self.symbol_index = dict((s, i)
+                                     for i, s in enumerate(self.data_handler.symbol_list))
+            # Intrabar resolution needs the aligned bars of the CSVDataHandler
+            resolver = None
+            if execution.get('intrabar_timeframe') and hasattr(self.data_handler, 'bars_datetime'):
+                resolver = IntrabarResolver(
+                    self.data_handler, execution['intrabar_timeframe'])
+
+            self.order_manager = OrderManager(
+                self.data_handler.symbol_list, resolver)
+
+        # Orders left to fill, by symbol: [order, remaining quantity]
+        self.pending_orders = dict()
+
+    def _fill_price(self, direction, price, quantity, volume):
+        """
+        It returns the price of a fill after half the spread, the slippage and the market impact
+        """
+        cost = self.spread / 2 + self.slippage
+        if self.impact and volume > 0:
+            cost += self.impact * np.sqrt(quantity / volume)
+
+        sign = 1 if direction in self.buy_directions else -1
+        return price * (1 + sign * cost)
+
+    def _fill(self, order, remaining, price, volume):
+        """
+        It fills what the volume allows of the remaining quantity of an order at a given price
+        and returns the quantity left to fill
+        """
+        quantity = remaining
+        if self.max_participation is not None:
+            quantity = min(remaining, self.max_participation * volume)
+
+        if quantity <= 0:
+            return remaining
+
+        fill_event = FillEvent(
+            self.data_handler.get_latest_bar_datetime(order.symbol),
+            order.symbol,
+            self.exchange,
+            quantity,
+            order.direction,
+            self._fill_price(order.direction, price, quantity, volume),
+            self.fees_rate
+        )
+        self.events.put(fill_event)
+
+        return remaining - quantity
+
+    def _latest(self, value_type, symbol):
+        return self.data_handler.get_latest_bars_matrix(value_type)[self.symbol_index[symbol], -1]
 
     def execute_order(self, event):
         """
-        Simply converts Order objects into Fill objects naively, i.e. without any latency, slippage or fill ratio problems.
+        Converts Order objects into Fill objects, at once or over the next bars depending on the fill price and participation.
+        A new order on a symbol replaces what is left of the previous one.
 
         Parameters:
           event: Contains an Event object with order information.
         """
         if event.type == 'ORDER':
-            fill_event = FillEvent(
-                datetime.utcnow(),
-                event.symbol,
-                'binance',
-                event.quantity,
-                event.direction,
-                event.fill_cost
-            )
-            self.events.put(fill_event)
+            if self.data_handler is None:
+                fill_event = FillEvent(
+                    datetime.utcnow(),
+                    event.symbol,
+                    self.exchange,
+                    event.quantity,
+                    event.direction,
+                    event.fill_cost,
+                    self.fees_rate
+                )
+                self.events.put(fill_event)
+                return
+
+            if event.order_type == 'CANCEL':
+                self.order_manager.cancel(event.order_id)
+                return
+
+            if event.order_type != 'MKT':
+                self.order_manager.add(event)
+                return
+
+            self.pending_orders.pop(event.symbol, None)
+            remaining = event.quantity
+
+            if self.fill_price == 'close':
+                remaining = self._fill(event, remaining, event.fill_cost,
+                                       self._latest('volume', event.symbol))
+
+            if remaining > 0:
+                self.pending_orders[event.symbol] = [event, remaining]
+
+    def update_fills(self):
+        """
+        It fills the pending orders at the open of the new bar, then the resting orders crossed by the bar,
+        within the volume participation cap
+        """
+        if not self.pending_orders and not len(self.order_manager):
+            return
+
+        opens = self.data_handler.get_latest_bars_matrix('open')[:, -1]
+        volumes = self.data_handler.get_latest_bars_matrix('volume')[:, -1]
+
+        for symbol, pending in list(self.pending_orders.items()):
+            i = self.symbol_index[symbol]
+            pending[1] = self._fill(pending[0], pending[1], opens[i], volumes[i])
+
+            if pending[1] <= 0:
+                del self.pending_orders[symbol]
+
+        if not len(self.order_manager):
+            return
+
+        highs = self.data_handler.get_latest_bars_matrix('high')[:, -1]
+        lows = self.data_handler.get_latest_bars_matrix('low')[:, -1]
+
+        for order, price in self.order_manager.match(opens, highs, lows):
+            remaining = self._fill(order, order.quantity, price,
+                                   volumes[self.symbol_index[order.symbol]])
+
+            # What the volume did not allow is left to fill at the next bars open
+            if remaining > 0:
+                self.pending_orders[order.symbol] = [order, remaining]
+
+
+class ReplayExecutionHandler(ExecutionHandler):
+    """
+    The replay execution handler fills market orders against the order books recorded by OrderBookRecorder,
+    walking the depth of the latest snapshot at the bar time to price each order by its size.
+    What the recorded depth cannot fill is dropped, and orders without a recorded snapshot are filled at their fill_cost.
+    Other order types (LMT, STP, TP) are not replayed: they are reported with a 'REJECTED' FillEvent, so the portfolio
+    does not wait for them. CANCEL orders are ignored, as no order is ever resting.
+    Settings come from the 'order_book_replay' config key: directory, depth and fees_rate.
+    """
+
+    buy_directions = ('BUY', 'SHORTCOVER')
+
+    def __init__(self, events, data_handler=None):
+        """
+        Initialises the handler, setting the event queues up internally.
+        Parameters:
+          events: The Queue of Event objects.
+          data_handler: The DataHandler giving the bar time of the orders.
+        """
+        self.events = events
+        self.data_handler = data_handler
+        self.config = load_config()
+
+        replay = self.config.get('order_book_replay', dict())
+        self.directory = replay.get('directory', 'order_books')
+        self.depth = replay.get('depth', 10)
+        self.fees_rate = replay.get('fees_rate', 0.0)
+
+        # Memory-mapped recordings, opened on the first order of each symbol
+        self.replays = dict()
+
+    def _replay(self, symbol):
+        if symbol not in self.replays:
+            self.replays[symbol] = OrderBookReplay(
+                symbol, self.directory, self.depth)
+        return self.replays[symbol]
+
+    def execute_order(self, event):
+        """
+        Converts market Order objects into Fill objects priced by the recorded depth, and rejects the other types.
+
+        Parameters:
+          event: Contains an Event object with order information.
+        """
+        if event.type != 'ORDER' or event.order_type == 'CANCEL':
+            return
+
+        timeindex = self.data_handler.get_latest_bar_datetime(event.symbol)
+
+        if event.order_type != 'MKT':
+            print(f'{event.order_type} orders are not supported by the order book replay')
+            self.events.put(FillEvent(timeindex, event.symbol, 'replay', 0, event.direction,
+                                      event.fill_cost, order_id=event.order_id, status='REJECTED'))
+            return
+
+        side = 'buy' if event.direction in self.buy_directions else 'sell'
+
+        price, quantity = self._replay(event.symbol).fill(
+            side, event.quantity, timeindex.value // 10**6)
+
+        if quantity == 0:
+            price, quantity = event.fill_cost, event.quantity
+        elif quantity < event.quantity:
+            print(f'Order {event.order_id} on {event.symbol}: {quantity} filled out of {event.quantity}')
+
+        fill_event = FillEvent(
+            timeindex,
+            event.symbol,
+            'replay',
+            quantity,
+            event.direction,
+            price,
+            self.fees_rate,
+            order_id=event.order_id
+        )
+        self.events.put(fill_event)
 
 
 class CCXTExecutionHandler(ExecutionHandler):
     """
-    Implement a live execution handler using CCXT library
+    Live execution handler submitting orders through the ccxt async API.
+
+    The exchange runs on an asyncio loop in a background thread, so its HTTP session is reused between orders
+    and its rate limiter throttles every request. execute_order() only schedules the order and returns at once:
+    each order is then polled concurrently until it is closed, a FillEvent being put on the events queue
+    for every newly filled quantity, so partial fills reach the portfolio as they happen.
+    Submissions refused before reaching the exchange (rate limits) are retried with an exponential backoff.
+    Every order is sent with a unique clientOrderId: a submission which timed out may have been accepted, so the
+    order is looked up by it and only resubmitted when the exchange does not know it.
+    An order which cannot be submitted, which the exchange rejects or expires, or whose type is not supported,
+    is reported with a 'REJECTED' FillEvent. An order cancelled while its submission is in flight is cancelled
+    as soon as the exchange acknowledges it.
     """
 
-    def __init__(self, events):
+    # Side of the exchange order of each order direction
+    sides = {
+        'BUY': 'buy',
+        'SELL': 'sell',
+        'SHORTSELL': 'sell',
+        'SHORTCOVER': 'buy'
+    }
+
+    order_types = {
+        'MKT': 'market',
+        'LMT': 'limit'
+    }
+
+    # Order status after which it will not be filled anymore
+    final_status = ('closed', 'canceled', 'expired', 'rejected')
+
+    def __init__(self, events, data_handler=None, exchange=None, poll_interval=1, retries=3, backoff=1):
         """
         Initialises the handler, setting the event queues up internally.
         Parameters:
           events: The Queue of Event objects.
+          data_handler: The DataHandler of the engine.
+          exchange: A ccxt.async_support exchange, or any object with the same interface. Created from the config by default.
+          poll_interval: Seconds between two status requests of an open order.
+          retries: Max number of retries of a submission refused by a rate limit or timed out.
+          backoff: Seconds before the first retry, doubled at each retry.
         """
         self.events = events
+        self.data_handler = data_handler
+        self.config = load_config()
+        self.poll_interval = poll_interval
+        self.retries = retries
+        self.backoff = backoff
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name='ccxt-execution', daemon=True)
+        self.thread.start()
+
+        self.exchange = exchange or self._create_exchange()
+        self.exchange_id = getattr(self.exchange, 'id', 'ccxt')
+
+        # Open exchange orders being polled, by OrderEvent order_id
+        self.open_orders = dict()
+
+        # OrderEvent order_ids being submitted, and the ones among them cancelled meanwhile
+        self.submitting = set()
+        self.pending_cancels = set()
+
+        # Prefix of the clientOrderIds, unique to the run
+        self.client_prefix = f'bot{uuid.uuid4().hex[:12]}-'
+
+    def __repr__(self):
+        return f'<CCXTExecutionHandler: {self.exchange_id}, {len(self.open_orders)} open orders>'
+
+    def _create_exchange(self):
+        """
+        The async exchange has to be created in the loop it runs on
+        """
+        async def create():
+            if self.config['exchange']['id'] == 'fake':
+                return AsyncFakeExchange(**{'symbols': self.config.get('symbol_list'),
+                                            **self.config['exchange'].get('fake', dict())})
+
+            exchange_class = getattr(ccxt_async, self.config['exchange']['id'])
+            return exchange_class({
+                'apiKey': self.config['exchange']['key'],
+                'secret': self.config['exchange']['secret'],
+                'timeout': 30000,
+                'enableRateLimit': True,
+            })
+
+        return asyncio.run_coroutine_threadsafe(create(), self.loop).result()
 
     def execute_order(self, event):
+        """
+        Schedules the submission of an Order, without waiting for the exchange.
+
+        Parameters:
+          event: Contains an Event object with order information.
+        """
         if event.type == 'ORDER':
-            pass
+            if event.order_type == 'CANCEL':
+                asyncio.run_coroutine_threadsafe(
+                    self._cancel(event), self.loop)
+            elif event.order_type in self.order_types:
+                asyncio.run_coroutine_threadsafe(
+                    self._submit(event), self.loop)
+            else:
+                print(f'{event.order_type} orders are not supported on {self.exchange_id}')
+                self._emit_reject(event)
+
+    def _taker_fees_rate(self, symbol):
+        markets = getattr(self.exchange, 'markets', None) or dict()
+        return markets.get(symbol, dict()).get('taker', 0.0)
+
+    def _emit_fill(self, event, order, quantity, cost, fees_rate):
+        """
+        It puts a FillEvent for a newly filled quantity, at its average price
+        """
+        timestamp = order.get('lastTradeTimestamp') or order.get('timestamp')
+
+        fill_event = FillEvent(
+            datetime.utcfromtimestamp(
+                timestamp / 1000) if timestamp else datetime.utcnow(),
+            event.symbol,
+            self.exchange_id,
+            quantity,
+            event.direction,
+            cost / quantity,
+            fees_rate,
+            order_id=event.order_id
+        )
+        self.events.put(fill_event)
+
+    def _emit_reject(self, event):
+        """
+        It tells the portfolio an order will never be filled
+        """
+        fill_event = FillEvent(
+            datetime.utcnow(),
+            event.symbol,
+            self.exchange_id,
+            0,
+            event.direction,
+            event.fill_cost,
+            order_id=event.order_id,
+            status='REJECTED'
+        )
+        self.events.put(fill_event)
+
+    async def _create_order(self, event):
+        """
+        It submits an order with a unique clientOrderId, retrying with an exponential backoff the requests refused
+        before reaching the exchange. After a timeout, the order is looked up by its clientOrderId before being
+        resubmitted, as the exchange may have accepted it.
+        """
+        price = (event.price or event.fill_cost) if event.order_type == 'LMT' else None
+        client_order_id = f'{self.client_prefix}{event.order_id}'
+        timed_out = False
+
+        for attempt in range(self.retries + 1):
+            try:
+                if timed_out:
+                    order = await self._find_order(event.symbol, client_order_id)
+                    if order is not None:
+                        return order
+
+                return await self.exchange.create_order(
+                    event.symbol,
+                    self.order_types[event.order_type],
+                    self.sides[event.direction],
+                    event.quantity,
+                    price,
+                    {'clientOrderId': client_order_id}
+                )
+            except ccxt.DDoSProtection as e:
+                # Includes RateLimitExceeded
+                error = e
+            except ccxt.RequestTimeout as e:
+                error = e
+                timed_out = True
+
+            if attempt == self.retries:
+                raise error
+
+            delay = self.backoff * 2 ** attempt
+            print(f'Order {event.direction} {event.quantity} {event.symbol} request failed: {error}, '
+                  f'retrying in {delay}s')
+            await asyncio.sleep(delay)
+
+    async def _find_order(self, symbol, client_order_id):
+        """
+        It returns the exchange order sent with client_order_id, or None when the exchange does not know it
+        """
+        if self.exchange.has.get('fetchOpenOrders'):
+            for order in await self.exchange.fetch_open_orders(symbol):
+                if order.get('clientOrderId') == client_order_id:
+                    return order
+
+        # A closed order, e.g. a filled market order, is not open anymore
+        try:
+            return await self.exchange.fetch_order(None, symbol, {'clientOrderId': client_order_id})
+        except ccxt.OrderNotFound:
+            return None
+
+    async def _submit(self, event):
+        self.submitting.add(event.order_id)
+        try:
+            order = await self._create_order(event)
+        except ccxt.BaseError as e:
+            print(f'Order {event.direction} {event.quantity} {event.symbol} failed: {e}')
+            self.pending_cancels.discard(event.order_id)
+            self._emit_reject(event)
+            return
+        finally:
+            self.submitting.discard(event.order_id)
+
+        self.open_orders[event.order_id] = order
+        try:
+            if event.order_id in self.pending_cancels:
+                self.pending_cancels.discard(event.order_id)
+                await self._cancel_order(order, event.symbol)
+
+            await self._watch(event, order)
+        finally:
+            self.open_orders.pop(event.order_id, None)
+
+    async def _cancel(self, event):
+        """
+        It cancels the exchange order of a resting OrderEvent, its fills so far being kept.
+        An order still being submitted is cancelled once created.
+        """
+        order = self.open_orders.get(event.order_id)
+        if order is not None:
+            await self._cancel_order(order, event.symbol)
+        elif event.order_id in self.submitting:
+            self.pending_cancels.add(event.order_id)
+        else:
+            print(f'Cancel of unknown order {event.order_id} {event.symbol} ignored')
+
+    async def _cancel_order(self, order, symbol):
+        try:
+            await self.exchange.cancel_order(order['id'], symbol)
+        except ccxt.BaseError as e:
+            print(f'Order {order["id"]} cancel failed: {e}')
+
+    async def _watch(self, event, order):
+        """
+        It polls an order until it is closed, emitting a FillEvent for each new partial fill
+        """
+        filled = 0.0
+        cost = 0.0
+        fees = 0.0
+
+        while True:
+            new_filled = order.get('filled') or 0.0
+            if new_filled > filled:
+                # Fall back on the order price when the exchange does not report the filled cost
+                new_cost = order.get('cost') or new_filled * \
+                    (order.get('average') or order.get('price') or event.fill_cost)
+
+                # Fees are cumulated over the order, the rate applies to the new fill only
+                fee = order.get('fee') or dict()
+                new_fees = fee.get('cost')
+                fees_rate = self._taker_fees_rate(event.symbol)
+
+                if new_fees is not None and new_cost > cost:
+                    base, quote = split_symbol(event.symbol)
+                    fill_fees = new_fees - fees
+                    fees = new_fees
+
+                    # Fees charged in the base asset are valued at the fill price, in another asset (e.g. BNB)
+                    # the fee schedule is kept
+                    if fee.get('currency') == base:
+                        fill_fees *= (new_cost - cost) / (new_filled - filled)
+                    if fee.get('currency') in (None, quote, base):
+                        fees_rate = fill_fees / (new_cost - cost)
+
+                self._emit_fill(event, order, new_filled - filled,
+                                new_cost - cost, fees_rate)
+                filled, cost = new_filled, new_cost
+
+            if order.get('status') in self.final_status:
+                if order.get('status') in ('expired', 'rejected'):
+                    self._emit_reject(event)
+                return
+
+            await asyncio.sleep(self.poll_interval)
+
+            try:
+                order = await self.exchange.fetch_order(order['id'], event.symbol)
+            except ccxt.NetworkError as e:
+                print(f'Order {order["id"]} status request failed: {e}')
+            except ccxt.ExchangeError as e:
+                print(f'Order {order["id"]} cannot be followed anymore: {e}')
+                return
+
+    def close(self, timeout=None):
+        """
+        It closes the exchange session and stops the background loop
+        """
+        if hasattr(self.exchange, 'close'):
+            asyncio.run_coroutine_threadsafe(
+                self.exchange.close(), self.loop).result(timeout)
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
@@ -0,0 +1,435 @@
+import asyncio
+import itertools
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+
+import ccxt
+
+
+class FakeExchange:
+    """
+    FakeExchange is an in-process exchange exposing the subset of the ccxt API used by the bot
+    (load_markets, fetch_ohlcv, fetch_order_book, fetch_ticker(s), create_order, fetch_order, fetch_open_orders,
+    cancel_order), so the live loop can be run and load-tested offline.
+
+    Candles are replayed from the exchange_data CSV files. A symbol without a file of its own (e.g. 'FAKE42/BTC')
+    replays one of the files, so any number of symbols can be served. The replay clock advances by one bar
+    every 1 / speed seconds, or with advance(). Markets are listed for the given symbols, the ones of the CSV files
+    by default, and for any symbol served since. Order books are built around the latest close.
+    Market orders are filled against the book, limit orders once the close crosses their price,
+    max_fill of the order amount being filled per request, so orders can be partially filled.
+    An order can be looked up by the clientOrderId it was created with.
+
+    Every request waits latency seconds (plus up to jitter), and raises ccxt.RequestTimeout with probability
+    timeout_rate or ccxt.RateLimitExceeded with probability rate_limit_rate, or when more than
+    rate_limit requests are made within a second. With probability accepted_timeout_rate, create_order raises
+    ccxt.RequestTimeout after the order was created, like a response lost on the way back.
+    """
+
+    id = 'fake'
+
+    has = {
+        'fetchOHLCV': True,
+        'fetchOrderBook': True,
+        'fetchTicker': True,
+        'fetchTickers': True,
+        'createOrder': True,
+        'fetchOrder': True,
+        'fetchOpenOrders': True,
+        'cancelOrder': True
+    }
+
+    def __init__(self, timeframe='1h', symbols=None, start_bar=500, speed=None, latency=0.0, jitter=0.0,
+                 timeout_rate=0.0, rate_limit_rate=0.0, accepted_timeout_rate=0.0, rate_limit=None, spread=0.001,
+                 depth=20, max_fill=1.0, fees_rate=0.001, seed=None):
+        """
+        Parameters:
+            timeframe: The timeframe of the replayed CSV files.
+            symbols: Symbols listed by load_markets. The symbols of the CSV files by default.
+            start_bar: Index of the first bar served, the bars before it being the available history.
+            speed: Number of bars replayed per second. None only advances the clock with advance().
+            latency, jitter: Fixed and random delay of each request, in seconds.
+            timeout_rate, rate_limit_rate: Probabilities of a request raising RequestTimeout or RateLimitExceeded.
+            accepted_timeout_rate: Probability of create_order raising RequestTimeout once the order is created.
+            rate_limit: Max number of requests per second, None for no limit.
+            spread: Bid/ask spread of the order books as a fraction of the close.
+            depth: Number of levels of the order books.
+            max_fill: Max fraction of an order amount filled per request.
+            fees_rate: Taker fees of the markets.
+            seed: Seed of the random faults.
+        """
+        self.csv_dir = 'exchange_data'
+        self.timeframe = timeframe
+
+        self.start_bar = start_bar
+        self.speed = speed
+        self.started_at = time.monotonic()
+        self.bar = start_bar
+
+        self.latency = latency
+        self.jitter = jitter
+        self.timeout_rate = timeout_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.accepted_timeout_rate = accepted_timeout_rate
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+
+        self.spread = spread
+        self.depth = depth
+        self.max_fill = max_fill
+        self.fees_rate = fees_rate
+
+        # Candles of each symbol, as a (bars x OHLCV) float matrix with timestamps in ms
+        self.symbol_data = dict()
+        self.csv_path = Path(f'{Path().absolute()}/{self.csv_dir}')
+        self.sources = sorted(self.csv_path.glob(f'*_{self.timeframe}.csv'))
+        self.next_source = itertools.cycle(self.sources)
+
+        self.symbols = list(symbols) if symbols else \
+            ['/'.join(path.stem.rsplit('_', 1)[0].split('-')) for path in self.sources]
+
+        self.markets = dict()
+        self.orders = dict()
+        self.order_ids = itertools.count(1)
+
+        # Timestamps of the requests of the last second
+        self.requests = list()
+
+        # Number of requests served or failed, by method
+        self.stats = dict()
+
+    def __repr__(self):
+        return f'<FakeExchange: {len(self.symbol_data)} symbols, bar {self.bar}>'
+
+    @staticmethod
+    def synthetic_symbols(n, quote='BTC'):
+        """
+        It returns n symbol names replaying the CSV files, e.g. for load tests
+        """
+        return [f'FAKE{i}/{quote}' for i in range(n)]
+
+    def advance(self, n=1):
+        """
+        It moves the replay clock n bars forward
+        """
+        self.bar += n
+
+    def _current_bar(self):
+        if self.speed is not None:
+            self.bar = self.start_bar + \
+                int((time.monotonic() - self.started_at) * self.speed)
+        return self.bar
+
+    def _load_symbol(self, symbol):
+        if symbol in self.symbol_data:
+            return self.symbol_data[symbol]
+
+        path = self.csv_path / \
+            f'{"-".join(symbol.split("/"))}_{self.timeframe}.csv'
+        if not path.exists():
+            if not self.sources:
+                raise ccxt.BadSymbol(f'{self.id} does not have market symbol {symbol}')
+            path = next(self.next_source)
+
+        bars = pd.read_csv(path, header=None)
+        bars = bars.drop_duplicates(subset=0).sort_values(0)
+        self.symbol_data[symbol] = bars.values.astype(float)
+
+        return self.symbol_data[symbol]
+
+    def _bars(self, symbol):
+        """
+        It returns the bars of symbol replayed so far, the last one being the forming candle
+        """
+        data = self._load_symbol(symbol)
+        return data[:min(self._current_bar(), len(data) - 1) + 1]
+
+    def _fault(self, method):
+        """
+        It counts a request and raises the configured errors
+        """
+        stats = self.stats.setdefault(
+            method, {'requests': 0, 'timeouts': 0, 'rate_limited': 0})
+        stats['requests'] += 1
+
+        now = time.monotonic()
+        if self.rate_limit is not None:
+            self.requests = [t for t in self.requests if now - t < 1]
+            self.requests.append(now)
+            if len(self.requests) > self.rate_limit:
+                stats['rate_limited'] += 1
+                raise ccxt.RateLimitExceeded(f'{self.id} {method} rate limit exceeded')
+
+        draw = self.random.random()
+        if draw < self.timeout_rate:
+            stats['timeouts'] += 1
+            raise ccxt.RequestTimeout(f'{self.id} {method} request timed out')
+        if draw < self.timeout_rate + self.rate_limit_rate:
+            stats['rate_limited'] += 1
+            raise ccxt.RateLimitExceeded(f'{self.id} {method} rate limit exceeded')
+
+    def _lost_response(self, method):
+        """
+        It raises ccxt.RequestTimeout with probability accepted_timeout_rate, once the request was served
+        """
+        if self.random.random() < self.accepted_timeout_rate:
+            self.stats[method]['timeouts'] += 1
+            raise ccxt.RequestTimeout(f'{self.id} {method} request timed out')
+
+    def _delay(self):
+        return self.latency + self.random.random() * self.jitter
+
+    def _request(self, method):
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        self._fault(method)
+
+    def load_markets(self, reload=False):
+        self._request('load_markets')
+        return self._load_markets(reload)
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
+        self._request('fetch_ohlcv')
+        return self._fetch_ohlcv(symbol, timeframe, since, limit)
+
+    def fetch_order_book(self, symbol, limit=None, params={}):
+        self._request('fetch_order_book')
+        return self._fetch_order_book(symbol, limit)
+
+    def fetch_ticker(self, symbol, params={}):
+        self._request('fetch_ticker')
+        return self._fetch_ticker(symbol)
+
+    def fetch_tickers(self, symbols=None, params={}):
+        self._request('fetch_tickers')
+        return self._fetch_tickers(symbols)
+
+    def create_order(self, symbol, type, side, amount, price=None, params={}):
+        self._request('create_order')
+        order = self._create_order(symbol, type, side, amount, price, params)
+        self._lost_response('create_order')
+        return order
+
+    def fetch_order(self, id, symbol=None, params={}):
+        self._request('fetch_order')
+        return self._fetch_order(id, params)
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params={}):
+        self._request('fetch_open_orders')
+        return self._fetch_open_orders(symbol)
+
+    def cancel_order(self, id, symbol=None, params={}):
+        self._request('cancel_order')
+        return self._cancel_order(id)
+
+    def _load_markets(self, reload=False):
+        for symbol in itertools.chain(self.symbols, self.symbol_data):
+            if symbol not in self.markets:
+                base, quote = symbol.split('/')
+                self.markets[symbol] = {
+                    'id': ''.join((base, quote)),
+                    'symbol': symbol,
+                    'base': base,
+                    'quote': quote,
+                    'active': True,
+                    'taker': self.fees_rate,
+                    'maker': self.fees_rate
+                }
+        return self.markets
+
+    def _fetch_ohlcv(self, symbol, timeframe=None, since=None, limit=None):
+        bars = self._bars(symbol)
+
+        if since is not None:
+            bars = bars[bars[:, 0] >= since]
+        if limit is not None:
+            bars = bars[-limit:]
+
+        return bars.tolist()
+
+    def _fetch_order_book(self, symbol, limit=None):
+        bar = self._bars(symbol)[-1]
+        close, volume = bar[4], bar[5]
+        depth = min(limit or self.depth, self.depth)
+
+        # Levels spaced by half the spread, each holding an equal share of the bar volume
+        steps = np.arange(depth) * self.spread / 2
+        amount = max(volume, 1.0) / depth
+
+        return {
+            'symbol': symbol,
+            'bids': [[close * (1 - self.spread / 2 - step), amount] for step in steps],
+            'asks': [[close * (1 + self.spread / 2 + step), amount] for step in steps],
+            'timestamp': int(bar[0]),
+            'nonce': None
+        }
+
+    def _fetch_ticker(self, symbol):
+        bar = self._bars(symbol)[-1]
+        close = bar[4]
+
+        return {
+            'symbol': symbol,
+            'timestamp': int(bar[0]),
+            'open': bar[1],
+            'high': bar[2],
+            'low': bar[3],
+            'close': close,
+            'last': close,
+            'bid': close * (1 - self.spread / 2),
+            'ask': close * (1 + self.spread / 2),
+            'baseVolume': bar[5]
+        }
+
+    def _fetch_tickers(self, symbols=None):
+        symbols = symbols or list(self.symbol_data)
+        return dict((symbol, self._fetch_ticker(symbol)) for symbol in symbols)
+
+    def _create_order(self, symbol, type, side, amount, price=None, params={}):
+        self._load_symbol(symbol)
+
+        order = {
+            'id': str(next(self.order_ids)),
+            'clientOrderId': params.get('clientOrderId'),
+            'symbol': symbol,
+            'type': type,
+            'side': side,
+            'price': price,
+            'amount': amount,
+            'filled': 0.0,
+            'remaining': amount,
+            'cost': 0.0,
+            'average': None,
+            'status': 'open',
+            'fee': {'cost': 0.0, 'currency': symbol.split('/')[1]},
+            'timestamp': int(self._bars(symbol)[-1][0]),
+            'lastTradeTimestamp': None
+        }
+        self.orders[order['id']] = order
+        self._match(order)
+
+        return dict(order)
+
+    def _match(self, order):
+        """
+        It fills up to max_fill of the order amount against the book, limit orders only when the close crosses their price
+        """
+        if order['status'] != 'open':
+            return
+
+        ticker = self._fetch_ticker(order['symbol'])
+        price = ticker['ask'] if order['side'] == 'buy' else ticker['bid']
+
+        if order['type'] == 'limit':
+            crossed = ticker['close'] <= order['price'] if order['side'] == 'buy' \
+                else ticker['close'] >= order['price']
+            if not crossed:
+                return
+            price = order['price']
+
+        quantity = min(order['remaining'], self.max_fill * order['amount'])
+
+        order['filled'] += quantity
+        order['remaining'] -= quantity
+        order['cost'] += quantity * price
+        order['average'] = order['cost'] / order['filled']
+        order['fee']['cost'] += quantity * price * self.fees_rate
+        order['lastTradeTimestamp'] = ticker['timestamp']
+
+        if order['remaining'] <= 1e-12 * order['amount']:
+            order['remaining'] = 0.0
+            order['status'] = 'closed'
+
+    def _fetch_order(self, id, params={}):
+        """
+        It returns the order of id, or of the clientOrderId of params when id is None
+        """
+        client_order_id = params.get('clientOrderId')
+        if id is None and client_order_id is not None:
+            id = next((order['id'] for order in self.orders.values()
+                       if order['clientOrderId'] == client_order_id), None)
+
+        try:
+            order = self.orders[id]
+        except KeyError:
+            raise ccxt.OrderNotFound(f'{self.id} order {id or client_order_id} not found')
+
+        self._match(order)
+        return dict(order)
+
+    def _fetch_open_orders(self, symbol=None):
+        orders = list()
+
+        for order in self.orders.values():
+            if symbol is None or order['symbol'] == symbol:
+                self._match(order)
+                if order['status'] == 'open':
+                    orders.append(dict(order))
+
+        return orders
+
+    def _cancel_order(self, id):
+        order = self._fetch_order(id)
+        if order['status'] == 'open':
+            self.orders[id]['status'] = 'canceled'
+        return dict(self.orders[id])
+
+
+class AsyncFakeExchange(FakeExchange):
+    """
+    FakeExchange with the ccxt.async_support interface: every request is a coroutine awaiting its latency,
+    so concurrent requests overlap like on a real exchange.
+    """
+
+    async def _async_request(self, method):
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        self._fault(method)
+
+    async def load_markets(self, reload=False):
+        await self._async_request('load_markets')
+        return self._load_markets(reload)
+
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
+        await self._async_request('fetch_ohlcv')
+        return self._fetch_ohlcv(symbol, timeframe, since, limit)
+
+    async def fetch_order_book(self, symbol, limit=None, params={}):
+        await self._async_request('fetch_order_book')
+        return self._fetch_order_book(symbol, limit)
+
+    async def fetch_ticker(self, symbol, params={}):
+        await self._async_request('fetch_ticker')
+        return self._fetch_ticker(symbol)
+
+    async def fetch_tickers(self, symbols=None, params={}):
+        await self._async_request('fetch_tickers')
+        return self._fetch_tickers(symbols)
+
+    async def create_order(self, symbol, type, side, amount, price=None, params={}):
+        await self._async_request('create_order')
+        order = self._create_order(symbol, type, side, amount, price, params)
+        self._lost_response('create_order')
+        return order
+
+    async def fetch_order(self, id, symbol=None, params={}):
+        await self._async_request('fetch_order')
+        return self._fetch_order(id, params)
+
+    async def fetch_open_orders(self, symbol=None, since=None, limit=None, params={}):
+        await self._async_request('fetch_open_orders')
+        return self._fetch_open_orders(symbol)
+
+    async def cancel_order(self, id, symbol=None, params={}):
+        await self._async_request('cancel_order')
+        return self._cancel_order(id)
+
+    async def close(self):
+        pass
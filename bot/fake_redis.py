@@ -0,0 +1,105 @@
+import threading
+import time
+
+
+class FakePipeline:
+    """
+    FakePipeline buffers the commands of a FakeRedis pipeline until execute()
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = list()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.commands = list()
+
+    def set(self, key, value):
+        self.commands.append(('set', key, value))
+
+    def hset(self, key, mapping):
+        self.commands.append(('hset', key, dict(mapping)))
+
+    def execute(self):
+        commands, self.commands = self.commands, list()
+        return self.redis._execute(commands)
+
+
+class FakeRedis:
+    """
+    FakeRedis is an in-process stand-in of the subset of redis.Redis used by the StatePublisher
+    (pipeline, set, hset), so the state publishing can be run and checked without a Redis server.
+
+    Every executed command is appended to writes, as (command, key, value), and applied to data.
+    Each pipeline execution waits latency seconds, to simulate a slow Redis.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+
+        # Stored keys: a value for set, a dict of fields for hset
+        self.data = dict()
+        self.writes = list()
+
+    def __repr__(self):
+        return f'<FakeRedis: {len(self.data)} keys, {len(self.writes)} writes>'
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def set(self, key, value):
+        return self._execute([('set', key, value)])[0]
+
+    def hset(self, key, mapping):
+        return self._execute([('hset', key, dict(mapping))])[0]
+
+    def _execute(self, commands):
+        if self.latency:
+            time.sleep(self.latency)
+
+        results = list()
+        with self.lock:
+            for command, key, value in commands:
+                if command == 'set':
+                    self.data[key] = value
+                    results.append(True)
+                else:
+                    fields = self.data.setdefault(key, dict())
+                    results.append(len(set(value) - set(fields)))
+                    fields.update(value)
+
+                self.writes.append((command, key, value))
+
+        return results
+
+
+if __name__ == '__main__':
+    from publisher import StatePublisher
+
+    # Only the changed keys and fields are written
+    client = FakeRedis()
+    publisher = StatePublisher(client)
+    publisher.publish({'cash': 1000.0, 'symbol:ETH/BTC': {'is_open': 0, 'open_price': 0.0}})
+    publisher.publish({'cash': 1000.0, 'symbol:ETH/BTC': {'is_open': 1, 'open_price': 0.0}})
+    publisher.close()
+
+    assert client.writes[-1] == ('hset', 'symbol:ETH/BTC', {'is_open': 1}), client.writes
+    assert len(client.writes) == 3, client.writes
+
+    # A full queue drops its oldest state, the newest one being published
+    client = FakeRedis(latency=0.2)
+    publisher = StatePublisher(client, maxsize=2)
+    for cash in range(5):
+        publisher.publish({'cash': cash})
+        time.sleep(0.01)
+    time.sleep(0.5)
+    publisher.close()
+
+    published = [value for _, _, value in client.writes]
+    assert published == [0, 3, 4], published
+
+    print('StatePublisher checks passed')
@@ -12,6 +12,14 @@ def load_config():
     return config
 
 
+def timeframe_to_minutes(timeframe):
+    """
+    Returns the number of minutes of a ccxt timeframe, e.g. '15m' -> 15, '4h' -> 240
+    """
+    units = {'m': 1, 'h': 60, 'd': 60*24, 'w': 60*24*7}
+    return int(timeframe[:-1]) * units[timeframe[-1]]
+
+
 def parse_trades(filepath):
     trades = pd.read_csv(filepath, header=0,
                          parse_dates=True, index_col=0)
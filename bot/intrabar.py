@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+
+from helpers import timeframe_to_minutes
+
+
+class IntrabarResolver:
+    """
+    IntrabarResolver orders the resting orders triggered within a same bar with the lower timeframe bars of the bar,
+    e.g. the two 30m bars of a 1h bar: when a bar crosses both a stop and a target, the one crossed by the earliest
+    child bar is filled first.
+
+    The child bars of all symbols are loaded once, aligned like the CSVDataHandler bars, and the range of child bars
+    of each bar is precomputed with a searchsorted over the child timestamps, so resolving a bar only reads its
+    own child bars.
+    """
+
+    def __init__(self, data_handler, timeframe='30m'):
+        """
+        Parameters:
+            data_handler: The CSVDataHandler whose bars are resolved.
+            timeframe: The lower timeframe of the child bars.
+        """
+        self.data_handler = data_handler
+        self.symbol_list = self.data_handler.symbol_list
+        self.timeframe = timeframe
+
+        # Aligned (symbols x child bars) matrices of open, high and low
+        self.child_matrix = dict()
+        self.child_datetime = None
+
+        self._load_child_bars()
+
+        # Range of child bars [child_start[t], child_end[t]) of the bar t
+        bars_datetime = self.data_handler.bars_datetime.values
+        duration = np.timedelta64(
+            timeframe_to_minutes(self.data_handler.timeframe), 'm')
+
+        self.child_start = np.searchsorted(self.child_datetime, bars_datetime)
+        self.child_end = np.searchsorted(
+            self.child_datetime, bars_datetime + duration)
+
+    def __repr__(self):
+        return f'<IntrabarResolver: {self.timeframe} child bars>'
+
+    def _load_child_bars(self):
+        csv_files_path = f'{Path().absolute()}/{self.data_handler.csv_dir}'
+        columns = ['datetime', 'open', 'high', 'low', 'close', 'volume']
+
+        child_data = dict()
+        combined_index = None
+
+        for symbol in self.symbol_list:
+            bars = pd.read_csv(f'{csv_files_path}/{symbol}_{self.timeframe}.csv',
+                               header=None, index_col=0, names=columns)
+            bars.index = pd.to_datetime(bars.index, unit='ms')
+            child_data[symbol] = bars[~bars.index.duplicated()].sort_index()
+
+            combined_index = child_data[symbol].index if combined_index is None \
+                else combined_index.union(child_data[symbol].index)
+
+        for column in ('open', 'high', 'low'):
+            self.child_matrix[column] = np.vstack(
+                [child_data[symbol][column].reindex(index=combined_index, method='pad').values
+                 for symbol in self.symbol_list])
+
+        self.child_datetime = combined_index.values
+
+    def resolve(self, i, fills):
+        """
+        It sorts the orders triggered by the latest bar of the symbol i, as (order, is_down, price), in the order
+        the child bars triggered them, and returns them as (order, fill price).
+        Orders triggered by the same child bar keep their order, stops first. Orders no child bar triggers
+        (missing child data) are kept last.
+        """
+        t = self.data_handler.bar_index - 1
+        start, end = self.child_start[t], self.child_end[t]
+
+        opens = self.child_matrix['open'][i, start:end]
+        highs = self.child_matrix['high'][i, start:end]
+        lows = self.child_matrix['low'][i, start:end]
+
+        resolved = list()
+        for rank, (order, is_down, price) in enumerate(fills):
+            crossed = lows <= order.price if is_down else highs >= order.price
+
+            if crossed.any():
+                j = np.argmax(crossed)
+                # The order is filled at the open of the child bar which gapped through its price
+                child_open = opens[j]
+                price = min(order.price, child_open) if is_down else max(
+                    order.price, child_open)
+            else:
+                j = end - start
+
+            resolved.append((j, rank, order, price))
+
+        resolved.sort(key=lambda fill: fill[:2])
+
+        return [(order, price) for _, _, order, price in resolved]
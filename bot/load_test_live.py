@@ -0,0 +1,122 @@
+import argparse
+import queue
+import time
+
+import numpy as np
+
+from fake_exchange import FakeExchange, AsyncFakeExchange
+from data_handler.live_data_handler import LiveDataHandler
+
+
+def percentiles(latencies):
+    latencies = np.array(latencies) * 1000
+    return ' '.join(f'p{p}={np.percentile(latencies, p):.1f}ms' for p in (50, 95, 99)) + \
+        f' max={latencies.max():.1f}ms'
+
+
+parser = argparse.ArgumentParser(
+    description="Load test the live data loop against the local fake exchange")
+
+parser.add_argument('-n',
+                    '--symbols',
+                    type=int,
+                    default=100,
+                    help='Number of symbols')
+
+parser.add_argument('-b',
+                    '--bars',
+                    type=int,
+                    default=20,
+                    help='Number of bars to run')
+
+parser.add_argument('-t',
+                    '--timeframe',
+                    type=str,
+                    default='1h',
+                    help='Timeframe of the replayed data')
+
+parser.add_argument('--latency',
+                    type=float,
+                    default=0.0,
+                    help='Latency of each request, in seconds')
+
+parser.add_argument('--jitter',
+                    type=float,
+                    default=0.0,
+                    help='Max random latency added to each request, in seconds')
+
+parser.add_argument('--timeout-rate',
+                    type=float,
+                    default=0.0,
+                    help='Probability of a request timing out')
+
+parser.add_argument('--rate-limit-rate',
+                    type=float,
+                    default=0.0,
+                    help='Probability of a request being rate limited')
+
+parser.add_argument('--async',
+                    dest='async_fetch',
+                    action='store_true',
+                    help='Fetch the symbols concurrently with the AsyncLiveDataHandler')
+
+parser.add_argument('--seed',
+                    type=int,
+                    default=None,
+                    help='Seed of the random faults')
+
+
+args = parser.parse_args()
+
+exchange_class = AsyncFakeExchange if args.async_fetch else FakeExchange
+exchange = exchange_class(timeframe=args.timeframe, latency=args.latency, jitter=args.jitter,
+                          timeout_rate=args.timeout_rate, rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+symbol_list = FakeExchange.synthetic_symbols(args.symbols)
+
+events = queue.Queue()
+if args.async_fetch:
+    from data_handler.async_live_data_handler import AsyncLiveDataHandler
+    data_handler = AsyncLiveDataHandler(
+        events, symbol_list, args.timeframe, exchange=exchange)
+else:
+    data_handler = LiveDataHandler(
+        events, symbol_list, args.timeframe, exchange=exchange)
+
+bar_latencies = list()
+price_latencies = list()
+errors = 0
+
+start = time.perf_counter()
+
+for _ in range(args.bars):
+    exchange.advance()
+
+    try:
+        bar_start = time.perf_counter()
+        data_handler.update_bars()
+        bar_latencies.append(time.perf_counter() - bar_start)
+
+        prices_start = time.perf_counter()
+        data_handler.current_prices()
+        price_latencies.append(time.perf_counter() - prices_start)
+    except Exception as e:
+        errors += 1
+        print(f'Bar failed: {e}')
+
+elapsed = time.perf_counter() - start
+
+print(f'{args.symbols} symbols, {args.bars} bars in {elapsed:.2f}s '
+      f'({args.bars * args.symbols / elapsed:.0f} symbol bars/s), {errors} failed bars')
+if bar_latencies:
+    print(f'update_bars: {percentiles(bar_latencies)}')
+if price_latencies:
+    print(f'current_prices: {percentiles(price_latencies)}')
+
+for method, stats in exchange.stats.items():
+    print(f'{method}: {stats}')
+
+if args.async_fetch:
+    report = data_handler.latency_report().values()
+    print('fetch to event: ' + ' '.join(f'{key}={np.mean([r[key] for r in report]):.1f}ms'
+                                        for key in ('p50', 'p95', 'max')) + ' (mean over symbols)')
+    data_handler.close()
@@ -0,0 +1,87 @@
+import argparse
+import asyncio
+import queue
+import threading
+import time
+
+import numpy as np
+
+from fake_exchange import FakeExchange
+from stream_replay import StreamReplayServer
+from data_handler.stream_data_handler import StreamDataHandler
+
+
+parser = argparse.ArgumentParser(
+    description="Run the stream data handler against the local WebSocket replay server")
+
+parser.add_argument('-n',
+                    '--symbols',
+                    type=int,
+                    default=20,
+                    help='Number of symbols')
+
+parser.add_argument('-b',
+                    '--bars',
+                    type=int,
+                    default=20,
+                    help='Number of bars to run')
+
+parser.add_argument('-t',
+                    '--timeframe',
+                    type=str,
+                    default='1h',
+                    help='Timeframe of the replayed data')
+
+parser.add_argument('--interval',
+                    type=float,
+                    default=0.5,
+                    help='Number of seconds between two candle closes')
+
+parser.add_argument('--drop-every',
+                    type=int,
+                    default=None,
+                    help='Number of bars between two connection drops')
+
+parser.add_argument('--port',
+                    type=int,
+                    default=8765,
+                    help='Port of the replay server')
+
+
+args = parser.parse_args()
+
+symbol_list = FakeExchange.synthetic_symbols(args.symbols)
+exchange = FakeExchange(timeframe=args.timeframe, symbols=symbol_list)
+
+server = StreamReplayServer(exchange, symbol_list, port=args.port,
+                            interval=args.interval, drop_every=args.drop_every)
+threading.Thread(target=asyncio.run, args=(server.run(),), daemon=True).start()
+time.sleep(0.5)
+
+events = queue.Queue()
+data_handler = StreamDataHandler(events, symbol_list, args.timeframe,
+                                 exchange=exchange, url=f'ws://localhost:{args.port}/stream')
+
+intervals = list()
+last = time.perf_counter()
+
+for _ in range(args.bars):
+    data_handler.update_bars()
+    now = time.perf_counter()
+    intervals.append(now - last)
+    last = now
+
+# Every symbol must hold the candles closed on the exchange up to its latest one, without gap nor duplicate
+latest = [data_handler.get_latest_bars(symbol, N=args.bars) for symbol in symbol_list]
+closed_bars = [bars[bars[:, 0] <= received[-1, 0]][-args.bars:]
+               for bars, received in zip((exchange._bars(symbol) for symbol in symbol_list), latest)]
+missing = sum(len(np.setdiff1d(bars[:, 0], received[:, 0]))
+              for bars, received in zip(closed_bars, latest))
+duplicates = sum(len(received) - len(np.unique(received[:, 0])) for received in latest)
+
+intervals = np.array(intervals[1:]) * 1000
+print(f'{args.symbols} symbols, {events.qsize()} market events, {data_handler.reconnects} reconnects')
+print(f'event interval: p50={np.percentile(intervals, 50):.1f}ms max={intervals.max():.1f}ms')
+print(f'{missing} missing and {duplicates} duplicated candles')
+
+data_handler.close(timeout=5)
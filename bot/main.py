@@ -1,6 +1,6 @@
 from portfolio import Portfolio
 from strategy.bbrsi_telegram import BBRSI
-from execution_handler import SimulatedExecutionHandler
+from execution_handler import SimulatedExecutionHandler, CCXTExecutionHandler
 from engine import Engine
 
 from datetime import datetime
@@ -14,7 +14,13 @@ if config['run_mode'] == 'backtest':
     start_date = datetime(2013, 1, 1)
 
 else:
-    from data_handler.live_data_handler import LiveDataHandler as DataHandler
+    # Bars are streamed with the 'stream' key, or fetched concurrently with the 'async_fetch' key
+    if 'stream' in config:
+        from data_handler.stream_data_handler import StreamDataHandler as DataHandler
+    elif config.get('async_fetch'):
+        from data_handler.async_live_data_handler import AsyncLiveDataHandler as DataHandler
+    else:
+        from data_handler.live_data_handler import LiveDataHandler as DataHandler
     heartbeat = config['heartbeat']
     start_date = datetime.utcnow()
 
@@ -22,6 +28,9 @@ symbol_list = config['symbol_list']
 timeframe = config['timeframe']
 initial_capital = config['initial_capital']
 
+# Orders are only sent to the exchange in live mode
+ExecutionHandler = CCXTExecutionHandler if config['run_mode'] == 'live' else SimulatedExecutionHandler
+
 engine = Engine(
     symbol_list=symbol_list,
     timeframe=timeframe,
@@ -31,7 +40,7 @@ engine = Engine(
     DataHandler=DataHandler,
     Portfolio=Portfolio,
     Strategy=BBRSI,
-    ExecutionHandler=SimulatedExecutionHandler
+    ExecutionHandler=ExecutionHandler
 )
 
 engine.start()
@@ -0,0 +1,140 @@
+import numpy as np
+
+from pathlib import Path
+import time
+
+
+def book_dtype(depth):
+    """
+    Returns the fixed-size record of a top-depth order book snapshot: levels missing from the book are NaN
+    """
+    return np.dtype([
+        ('timestamp', '<i8'),
+        ('bid_prices', '<f8', (depth,)),
+        ('bid_amounts', '<f4', (depth,)),
+        ('ask_prices', '<f8', (depth,)),
+        ('ask_amounts', '<f4', (depth,))
+    ])
+
+
+def walk_book(prices, amounts, quantity):
+    """
+    It walks the levels of one or several books (a row per book) to fill quantity,
+    and returns the average fill price and the filled quantity, which is less than quantity when the book is too thin.
+    """
+    prices = np.atleast_2d(prices)
+    amounts = np.nan_to_num(np.atleast_2d(amounts).astype(float))
+
+    # Quantity taken at each level
+    filled_before = np.cumsum(amounts, axis=1) - amounts
+    taken = np.clip(quantity - filled_before, 0, amounts)
+
+    filled = taken.sum(axis=1)
+    cost = np.nansum(taken * prices, axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return cost / filled, filled
+
+
+class OrderBookRecorder:
+    """
+    OrderBookRecorder appends the top-depth levels of order book snapshots to one binary file per symbol,
+    as fixed-size records (see book_dtype), so recordings can be memory-mapped back by OrderBookReplay.
+    Snapshots are buffered and written every flush_every snapshots.
+    """
+
+    def __init__(self, directory='order_books', depth=10, flush_every=100):
+        self.directory = Path(f'{Path().absolute()}/{directory}')
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.depth = depth
+        self.dtype = book_dtype(depth)
+        self.flush_every = flush_every
+
+        # Buffered snapshots of each symbol
+        self.buffers = dict()
+
+    def __repr__(self):
+        return f'<OrderBookRecorder: {self.directory}, depth {self.depth}>'
+
+    def path(self, symbol):
+        return self.directory / f'{"-".join(symbol.split("/"))}_{self.depth}.bin'
+
+    def record(self, symbol, book):
+        """
+        It buffers a ccxt order book snapshot of symbol, stamped with the local receive time
+        when the exchange does not report one
+        """
+        snapshot = np.zeros(1, dtype=self.dtype)[0]
+        snapshot['timestamp'] = book.get('timestamp') or int(time.time() * 1000)
+
+        for side in ('bids', 'asks'):
+            levels = np.full((self.depth, 2), np.nan)
+            top = np.array(book[side][:self.depth], dtype=float).reshape(-1, 2)
+            levels[:len(top)] = top
+
+            snapshot[f'{side[:-1]}_prices'] = levels[:, 0]
+            snapshot[f'{side[:-1]}_amounts'] = levels[:, 1]
+
+        buffer = self.buffers.setdefault(symbol, list())
+        buffer.append(snapshot)
+
+        if len(buffer) >= self.flush_every:
+            self.flush(symbol)
+
+    def flush(self, symbol=None):
+        """
+        It writes the buffered snapshots of symbol, or of all symbols
+        """
+        symbols = [symbol] if symbol is not None else list(self.buffers)
+
+        for symbol in symbols:
+            buffer = self.buffers.pop(symbol, None)
+            if not buffer:
+                continue
+
+            with open(self.path(symbol), 'ab') as f:
+                np.array(buffer, dtype=self.dtype).tofile(f)
+
+
+class OrderBookReplay:
+    """
+    OrderBookReplay memory-maps the snapshots recorded for a symbol, and prices orders by walking the depth
+    of the latest snapshot at a given time.
+    """
+
+    def __init__(self, symbol, directory='order_books', depth=10):
+        path = Path(f'{Path().absolute()}/{directory}') / \
+            f'{"-".join(symbol.split("/"))}_{depth}.bin'
+
+        self.symbol = symbol
+        self.snapshots = np.memmap(path, dtype=book_dtype(depth), mode='r')
+        self.timestamps = np.asarray(self.snapshots['timestamp'])
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def __repr__(self):
+        return f'<OrderBookReplay: {self.symbol}, {len(self)} snapshots>'
+
+    def snapshot_at(self, timestamp):
+        """
+        It returns the latest snapshot recorded at or before timestamp (in ms), None if there is none
+        """
+        i = np.searchsorted(self.timestamps, timestamp, side='right') - 1
+        return self.snapshots[i] if i >= 0 else None
+
+    def fill(self, side, quantity, timestamp):
+        """
+        It returns the average price and filled quantity of a 'buy' or 'sell' market order at timestamp,
+        (NaN, 0) when no snapshot is recorded yet
+        """
+        snapshot = self.snapshot_at(timestamp)
+        if snapshot is None:
+            return np.nan, 0.0
+
+        book_side = 'ask' if side == 'buy' else 'bid'
+        price, filled = walk_book(snapshot[f'{book_side}_prices'],
+                                  snapshot[f'{book_side}_amounts'], quantity)
+
+        return price[0], filled[0]
@@ -0,0 +1,153 @@
+import heapq
+
+import numpy as np
+
+
+class OrderManager:
+    """
+    OrderManager holds the resting orders of the simulated execution: limit ('LMT'), stop ('STP')
+    and take-profit ('TP') orders, until the price of a bar crosses them.
+
+    Each symbol has two price-sorted heaps:
+        - the 'down' heap (highest price first) holds the orders triggered when the low falls to their price:
+          buy limits / take-profits and sell stops,
+        - the 'up' heap (lowest price first) holds the orders triggered when the high rises to their price:
+          sell limits / take-profits and buy stops.
+    The top price of every heap is kept in arrays indexed like symbol_list, so a bar is matched in one vectorized
+    comparison, then only the crossed orders are popped: O(k log n) for k triggered orders out of n.
+    Cancelled orders are only flagged, and dropped when they reach the top of their heap.
+
+    Orders sharing an oco_id on a symbol are One-Cancels-the-Other: the first one filled cancels the others.
+    When a bar triggers several orders of a symbol, stops are filled first, unless a resolver
+    (e.g. an IntrabarResolver) orders them from lower timeframe bars.
+    """
+
+    buy_directions = ('BUY', 'SHORTCOVER')
+
+    def __init__(self, symbol_list, resolver=None):
+        """
+        Parameters:
+            symbol_list: The symbols which can hold resting orders.
+            resolver: An object whose resolve(i, fills) orders the fills triggered within a bar of the symbol i.
+        """
+        self.symbol_list = symbol_list
+        self.index = dict((s, i) for i, s in enumerate(self.symbol_list))
+
+        size = len(self.symbol_list)
+        self.down_heaps = [list() for _ in range(size)]
+        self.up_heaps = [list() for _ in range(size)]
+        self.down_tops = np.full(size, -np.inf)
+        self.up_tops = np.full(size, np.inf)
+
+        self.resolver = resolver
+
+        # Resting orders by order id
+        self.orders = dict()
+
+        # Ids of the resting orders of each (symbol, oco_id) group
+        self.oco_groups = dict()
+
+    def __len__(self):
+        return len(self.orders)
+
+    def __repr__(self):
+        return f'<OrderManager: {len(self)} resting orders>'
+
+    def _is_down(self, order):
+        """
+        Buy limits and take-profits wait for the price to fall, sell stops too
+        """
+        is_buy = order.direction in self.buy_directions
+        return is_buy if order.order_type in ('LMT', 'TP') else not is_buy
+
+    def add(self, order):
+        """
+        It rests an order until its price is crossed
+        """
+        i = self.index[order.symbol]
+        self.orders[order.order_id] = order
+
+        if order.oco_id is not None:
+            self.oco_groups.setdefault(
+                (order.symbol, order.oco_id), set()).add(order.order_id)
+
+        if self._is_down(order):
+            heapq.heappush(self.down_heaps[i], (-order.price, order.order_id))
+            self.down_tops[i] = -self.down_heaps[i][0][0]
+        else:
+            heapq.heappush(self.up_heaps[i], (order.price, order.order_id))
+            self.up_tops[i] = self.up_heaps[i][0][0]
+
+    def cancel(self, order_id):
+        """
+        It cancels a resting order, unknown or already triggered ids are ignored
+        """
+        order = self.orders.pop(order_id, None)
+
+        if order is not None and order.oco_id is not None:
+            group = self.oco_groups.get((order.symbol, order.oco_id), set())
+            group.discard(order_id)
+            if not group:
+                self.oco_groups.pop((order.symbol, order.oco_id), None)
+
+        return order
+
+    def _fire_oco(self, order):
+        """
+        It cancels the other orders of the OCO group of a filled order
+        """
+        for order_id in self.oco_groups.pop((order.symbol, order.oco_id), set()):
+            self.orders.pop(order_id, None)
+
+    def _pop_crossed(self, heap, crossed):
+        """
+        It pops the orders of a heap while crossed(price) and returns the live ones
+        """
+        triggered = list()
+
+        while heap and crossed(abs(heap[0][0])):
+            _, order_id = heapq.heappop(heap)
+            order = self.orders.pop(order_id, None)
+            if order is not None:
+                triggered.append(order)
+
+        return triggered
+
+    def match(self, opens, highs, lows):
+        """
+        It returns the orders triggered by the latest bar (ordered like symbol_list) with their fill price:
+        their own price, or the open when the bar gapped through it.
+        """
+        fills = list()
+
+        for i in np.flatnonzero((lows <= self.down_tops) | (highs >= self.up_tops)):
+            open_price, high, low = opens[i], highs[i], lows[i]
+
+            # (order, is_down, price) of each triggered order
+            triggered = [(order, True, min(order.price, open_price))
+                         for order in self._pop_crossed(self.down_heaps[i], lambda price: low <= price)]
+            triggered += [(order, False, max(order.price, open_price))
+                          for order in self._pop_crossed(self.up_heaps[i], lambda price: high >= price)]
+
+            triggered.sort(key=lambda fill: fill[0].order_type != 'STP')
+
+            if len(triggered) > 1 and self.resolver is not None:
+                symbol_fills = self.resolver.resolve(i, triggered)
+            else:
+                symbol_fills = [(order, price)
+                                for order, _, price in triggered]
+
+            fired = set()
+            for order, price in symbol_fills:
+                if order.oco_id is not None:
+                    if order.oco_id in fired:
+                        continue
+                    fired.add(order.oco_id)
+                    self._fire_oco(order)
+
+                fills.append((order, price))
+
+            self.down_tops[i] = (-self.down_heaps[i][0][0]) if self.down_heaps[i] else -np.inf
+            self.up_tops[i] = self.up_heaps[i][0][0] if self.up_heaps[i] else np.inf
+
+        return fills
@@ -17,26 +17,130 @@ def create_drawdowns(pnl):
     Calculate the largest peak-to-trough drawdown of the PnL curve as well as the duration of the drawdown.
     Requires that the pnl_returns is a pandas Series.
 
+    The High Water Mark is a running maximum and the duration a run-length count of the bars since it was last hit,
+    both computed in a vectorized way. The first bar has no drawdown, as the curve starts from its first value.
+
     Parameters:
       pnl: A pandas Series representing period percentage returns.
 
     Returns:
       drawdown, duration - Highest peak-to-trough drawdown and duration.
     """
+    idx = pnl.index
+    values = np.asarray(pnl, dtype=float)
+    bars = np.arange(len(values))
 
-    # Calculate the cumulative returns curve
-    # and set up the High Water Mark
-    hwm = [0]
+    # High Water Mark starting at 0, NaN values (i.e. the first return) keep the previous mark
+    hwm = np.fmax.accumulate(np.concatenate(([0.0], values[1:])))
 
-    # Create the drawdown and duration series
-    idx = pnl.index
-    drawdown = pd.Series(index=idx)
-    duration = pd.Series(index=idx)
+    drawdown = hwm - values
+    drawdown[:1] = np.nan
 
-    # Loop over the index range
-    for t in range(1, len(idx)):
-        hwm.append(max(hwm[t-1], pnl[t]))
-        drawdown[t] = (hwm[t]-pnl[t])
-        duration[t] = (0 if drawdown[t] == 0 else duration[t-1]+1)
+    # Bars elapsed since the latest bar at the High Water Mark, NaN until it is first reached
+    last_peak = np.maximum.accumulate(np.where(drawdown == 0, bars, -1))
+    duration = np.where(last_peak >= 0, bars - last_peak, np.nan)
+    duration[:1] = np.nan
+
+    drawdown = pd.Series(drawdown, index=idx)
+    duration = pd.Series(duration, index=idx)
 
     return drawdown, drawdown.max(), duration.max()
+
+
+class RunningMetrics:
+    """
+    RunningMetrics keeps the performance of a portfolio up to date in O(1) per bar, so it can be queried at any time
+    without rebuilding the equity curve: mean/variance of returns (Welford), Sharpe ratio, High Water Mark,
+    current/max drawdown and its duration, and win/loss tallies of closed trades.
+    Drawdowns are measured on the equity curve (total / initial capital), like create_drawdowns.
+    """
+
+    def __init__(self, initial_capital, periods=252):
+        """
+        Parameters:
+          initial_capital: The starting total of the portfolio.
+          periods: Number of bars per year used to annualise the Sharpe ratio.
+        """
+        self.initial_capital = initial_capital
+        self.periods = periods
+
+        self.previous_total = initial_capital
+        self.bars = 0
+        self.returns_mean = 0.0
+        self.returns_m2 = 0.0
+
+        self.equity = 1.0
+        self.hwm = 0.0
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+        self.drawdown_duration = 0
+        self.max_drawdown_duration = 0
+
+        self.total_trades = 0
+        self.win_trades = 0
+        self.loss_trades = 0
+        self.trades_returns_sum = 0.0
+
+    def __repr__(self):
+        return f'<RunningMetrics: {self.bars} bars, {self.total_trades} trades>'
+
+    def update(self, total):
+        """
+        It adds the portfolio total of a new bar
+        """
+        returns = total / self.previous_total - 1 if self.previous_total else 0.0
+        self.previous_total = total
+
+        # Welford's online mean and variance
+        self.bars += 1
+        delta = returns - self.returns_mean
+        self.returns_mean += delta / self.bars
+        self.returns_m2 += delta * (returns - self.returns_mean)
+
+        self.equity = total / self.initial_capital
+        self.hwm = max(self.hwm, self.equity)
+        self.drawdown = self.hwm - self.equity
+        self.max_drawdown = max(self.max_drawdown, self.drawdown)
+
+        self.drawdown_duration = 0 if self.drawdown == 0 else self.drawdown_duration + 1
+        self.max_drawdown_duration = max(
+            self.max_drawdown_duration, self.drawdown_duration)
+
+    def record_trade(self, returns):
+        """
+        It adds the returns of a closed trade to the win/loss tallies
+        """
+        self.total_trades += 1
+        self.trades_returns_sum += returns
+
+        if returns > 0:
+            self.win_trades += 1
+        else:
+            self.loss_trades += 1
+
+    @property
+    def returns_std(self):
+        return np.sqrt(self.returns_m2 / self.bars) if self.bars else 0.0
+
+    @property
+    def sharpe_ratio(self):
+        std = self.returns_std
+        return np.sqrt(self.periods) * self.returns_mean / std if std else 0.0
+
+    def snapshot(self):
+        """
+        It returns the current metrics as a flat dict of numbers
+        """
+        return {
+            'total_return': (self.equity - 1.0) * 100.0,
+            'sharpe_ratio': self.sharpe_ratio,
+            'drawdown': self.drawdown * 100.0,
+            'max_drawdown': self.max_drawdown * 100.0,
+            'drawdown_duration': self.drawdown_duration,
+            'max_drawdown_duration': self.max_drawdown_duration,
+            'total_trades': self.total_trades,
+            'win_trades': self.win_trades,
+            'loss_trades': self.loss_trades,
+            'win_pct': self.win_trades / self.total_trades * 100 if self.total_trades else 0.0,
+            'avg_return': self.trades_returns_sum / self.total_trades * 100 if self.total_trades else 0.0
+        }
@@ -0,0 +1,110 @@
+from collections import namedtuple
+
+
+PivotLevels = namedtuple('PivotLevels', ['pp', 's1', 's2', 's3', 'r1', 'r2', 'r3'])
+
+
+def pivot_points(high, low, close):
+    """
+    It returns the classic pivot point with its 3 supports and 3 resistances from a period HLC
+    """
+    pp = (high + low + close) / 3
+
+    return PivotLevels(
+        pp=pp,
+        s1=2 * pp - high,
+        s2=pp - (high - low),
+        s3=low - 2 * (high - pp),
+        r1=2 * pp - low,
+        r2=pp + (high - low),
+        r3=high + 2 * (pp - low)
+    )
+
+
+class PivotPoints:
+    """
+    PivotPoints maintains the daily ('D') and weekly ('W') pivot levels of every symbol, whatever the base timeframe.
+    The HLC of the running period is aggregated bar by bar, and levels are computed once, when the period closes.
+    Strategies read the levels of the previous completed period in O(1) with get().
+    """
+
+    periods = ('D', 'W')
+
+    def __init__(self, symbol_list, history=0):
+        """
+        Parameters:
+            symbol_list: The symbols to track.
+            history: Number of past bars replayed from the data handler the first time a symbol is updated.
+        """
+        self.symbol_list = symbol_list
+        self.history = history
+
+        # Running [period key, high, low, close] of the current period
+        self.running = {
+            period: dict((s, None) for s in self.symbol_list)
+            for period in self.periods
+        }
+
+        # Levels of the latest completed period
+        self.levels = {
+            period: dict((s, None) for s in self.symbol_list)
+            for period in self.periods
+        }
+
+    def __repr__(self):
+        return f'<PivotPoints: {len(self.symbol_list)} symbols>'
+
+    def _period_key(self, period, datetime):
+        if period == 'D':
+            return datetime.date()
+
+        year, week, _ = datetime.isocalendar()
+        return (year, week)
+
+    def update(self, symbol, datetime, high, low, close):
+        """
+        It adds a bar to the running periods of a symbol.
+        When the bar opens a new period, the levels of the period that just closed are computed and cached.
+        """
+        for period in self.periods:
+            key = self._period_key(period, datetime)
+            running = self.running[period][symbol]
+
+            if running is None or running[0] != key:
+                if running is not None:
+                    self.levels[period][symbol] = pivot_points(*running[1:])
+                self.running[period][symbol] = [key, high, low, close]
+            else:
+                running[1] = max(running[1], high)
+                running[2] = min(running[2], low)
+                running[3] = close
+
+    def update_from(self, data_handler):
+        """
+        It updates all symbols with the latest bar of the data handler.
+        The first time a symbol is seen, the last self.history bars are replayed to build its levels.
+        """
+        for symbol in self.symbol_list:
+            if self.running['D'][symbol] is None and self.history > 1:
+                bars = zip(*(
+                    data_handler.get_latest_bars_values(
+                        symbol, value_type, N=self.history)
+                    for value_type in ('datetime', 'high', 'low', 'close')
+                ))
+                for datetime, high, low, close in bars:
+                    self.update(symbol, datetime, high, low, close)
+                continue
+
+            self.update(
+                symbol,
+                data_handler.get_latest_bar_value(symbol, 'datetime'),
+                data_handler.get_latest_bar_value(symbol, 'high'),
+                data_handler.get_latest_bar_value(symbol, 'low'),
+                data_handler.get_latest_bar_value(symbol, 'close')
+            )
+
+    def get(self, symbol, period='D'):
+        """
+        It returns the PivotLevels of the previous completed period, or None while the first period is running
+        """
+        return self.levels[period][symbol]
@@ -3,82 +3,137 @@ import queue
 from math import floor
 import numpy as np
 import pandas as pd
-from performance import create_sharpe_ratio, create_drawdowns
+from performance import create_sharpe_ratio, create_drawdowns, RunningMetrics
 
 from event import OrderEvent, FillEvent
-from trade import Trade
+from trade import TradeLedger
 from helpers import load_config
+from publisher import StatePublisher
+from fake_redis import FakeRedis
+from sizing import create_sizer
+from valuation import Valuation
+from risk import create_risk_limits
 
 from pathlib import Path
-#import redis
 
 
 class Portfolio:
     """
     The Portfolio class handles the positions and market value of all instruments at a resolution of a "bar", i.e. secondly, minutely, 5-min, 30-min, 60 min.
-    The positions dict stores a time-index of the quantity of positions held.
-    The holdings dict stores the cash and total market holdings value of each symbol for a particular time-index, as well as the percentage change in portfolio total across bars.
+    Positions are signed quantities stored in an array indexed like symbol_list: positive when long, negative when short.
+    The current holdings dict stores the cash and the open trade of each symbol.
+    The history matrix stores, for each bar, the cash, total, fees and the market value and position of each symbol.
+
+    The same implementation trades long, short or long/short, depending on the mode:
+        - 'long': LONG signals open long positions, EXIT signals close them.
+        - 'short': SHORT signals open short positions, EXIT or EXITSHORT signals close them.
+        - 'long_short': both, EXIT closing the open position whatever its direction.
+    The mode is set by the 'portfolio_mode' config key, and defaults to the class mode.
+
+    Cash, total and market values are in the reporting currency set by the 'valuation' config key,
+    e.g. {"currency": "USDT"}, fills being converted from the quote currency of their symbol.
+    Without it, all symbols are assumed to share the quote currency of the cash.
     """
 
+    mode = 'long'
+    pct_capital_risk = 1
+
+    entry_signals = {
+        'long': ('LONG',),
+        'short': ('SHORT',),
+        'long_short': ('LONG', 'SHORT')
+    }
+
     def __init__(self, events, data_handler, start_date, initial_capital):
         self.config = load_config()
         self.events = events
 
         self.data_handler = data_handler
         self.symbol_list = self.data_handler.symbol_list
+        self.symbol_index = dict((s, i)
+                                 for i, s in enumerate(self.symbol_list))
 
         self.start_date = start_date
         self.initial_capital = initial_capital
 
-        # Current positions and holdings are init to 0
-        self.current_positions = self._construct_current_positions()
-        self.all_positions = self._construct_all_positions()
+        self.mode = self.config.get('portfolio_mode', self.mode)
+        if self.mode not in self.entry_signals:
+            raise ValueError(f'Unknown portfolio mode: {self.mode}')
+
+        # Signed positions and entry value of short positions, indexed like symbol_list
+        self.positions = np.zeros(len(self.symbol_list))
+        self.exposition = np.zeros(len(self.symbol_list))
+
+        # Signed value of the positions at the latest bar, in the reporting currency
+        self.exposures = np.zeros(len(self.symbol_list))
 
         self.current_holdings = self._construct_current_holdings()
-        self.all_holdings = self._construct_all_holdings()
+
+        valuation = self.config.get('valuation', dict())
+        self.valuation = Valuation(self.data_handler,
+                                   currency=valuation.get('currency'),
+                                   pairs=valuation.get('pairs'))
+
+        # Bar-indexed history of positions and holdings
+        self._construct_history()
 
         # Money Management
-        self.pct_capital_risk = 1
+        self.pct_capital_risk = self.config.get(
+            'pct_capital_risk', self.pct_capital_risk)
+        self.sizer = create_sizer(
+            self.config, self.symbol_list, self.pct_capital_risk)
+        self.risk_inputs = self.sizer.risk_inputs
+
+        # Datetime of the latest bar pushed to the rolling risk inputs, limits and metrics, live market events repeat a same bar
+        self.risk_bar_datetime = None
+
+        # Exposure and correlation caps, checked before opening a position
+        self.risk_limits = create_risk_limits(self.config, self.symbol_list)
 
         self.trades = None
+        self.trade_ledger = TradeLedger()
 
-        #self.redis = redis.Redis()
+        # Performance metrics updated on each bar
+        self.metrics = RunningMetrics(
+            self.initial_capital, periods=252*60*6.5)
+
+        # State published to Redis in live and dry modes, to an in-process FakeRedis when the 'redis' key is 'fake'
+        self.publisher = None
+        if self.config['run_mode'] != 'backtest':
+            self.publisher = StatePublisher(
+                FakeRedis() if self.config.get('redis') == 'fake' else None)
 
         self.indicators = dict()
 
+        # Ids of the resting orders sent, by symbol
+        self.resting_orders = dict()
+
     def __repr__(self):
-        return f'<Portfolio: Initial capital {self.initial_capital}>'
+        return f'<Portfolio: Initial capital {self.initial_capital}, {self.mode} mode>'
 
     def __str__(self):
         return f'Portfolio starting at {self.start_date} with {self.initial_capital} of initial capital.'
 
-    def _construct_current_positions(self):
-        """
-        This constructs the dictionary which will hold the instantaneous position quantity of the portfolio across all symbols.
-        """
-        positions = dict((s, 0.0) for s in self.symbol_list)
-
-        return positions
-
-    def _construct_all_positions(self):
+    def close(self, timeout=None):
         """
-        Constructs the positions list using the start_date to determine when the time index will begin.
+        It publishes the states still queued before the run exits
         """
-        positions = self._construct_current_positions()
-        positions['datetime'] = self.start_date
-
-        return [positions]
+        if self.publisher is not None:
+            self.publisher.close(timeout)
 
     def _construct_current_holdings(self):
         """
-        This constructs the dictionary which will hold the instantaneous value of the portfolio across all symbols.
+        This constructs the dictionary which will hold the open trade of each symbol and the money balance of the portfolio.
         """
         holdings = {
             s: {
                 'open_date': None,
                 'open_price': 0.0,
-                'current_value': 0.0,
-                'is_open': False
+                'is_open': False,
+                'direction': 'OUT',
+                'trade_id': None,
+                'close_price': 0.0,
+                'close_fees': 0.0
             }
             for s in self.symbol_list
         }
@@ -88,78 +143,104 @@ class Portfolio:
 
         return holdings
 
-    def _construct_all_holdings(self):
+    def _construct_history(self):
         """
-        Constructs the holdings list using the start_date to determine when the time index will begin.
+        Preallocates the bar-indexed history of the portfolio in a single float matrix.
+        Columns are cash, total, fees, then the market value and the position of each symbol.
+        The matrix is sized from the number of bars of the data handler when known, and doubles when full.
         """
-        holdings = self._construct_current_holdings()
-        holdings['datetime'] = self.start_date
+        self.history_columns = ['cash', 'total', 'fees'] + \
+            self.symbol_list + [f'{s}_position' for s in self.symbol_list]
+
+        capacity = getattr(self.data_handler, 'bars_count', 0) + 1
+        capacity = max(capacity, 1024)
 
-        return [holdings]
+        self.history = np.zeros((capacity, len(self.history_columns)))
+        self.history_datetime = np.empty(capacity, dtype='datetime64[ns]')
+        self.history_size = 0
 
-    def _update_all_positions(self, datetime):
+        self._record_bar(self.start_date, np.zeros(len(self.symbol_list)))
+
+    def _record_bar(self, datetime, market_values):
         """
-        It Updates portfolio with the latest positions of all symbols
-        It updates in each market data event
-        New positions are opened when an order get filled
+        It writes the current cash, total, fees, market values and positions in the next row of the history
         """
-        latest_positions = {
-            **self.current_positions,
-            'datetime': datetime
-        }
-        self.all_positions.append(latest_positions)
+        if self.history_size == len(self.history):
+            self.history = np.concatenate(
+                (self.history, np.zeros_like(self.history)))
+            self.history_datetime = np.concatenate(
+                (self.history_datetime, np.empty_like(self.history_datetime)))
+
+        nb_symbols = len(self.symbol_list)
+        row = self.history[self.history_size]
+
+        row[0] = self.current_holdings['cash']
+        row[1] = self.current_holdings['total']
+        row[2] = self.current_holdings['fees']
+        row[3:3 + nb_symbols] = market_values
+        row[3 + nb_symbols:] = self.positions
+
+        self.history_datetime[self.history_size] = datetime
+        self.history_size += 1
 
     def _update_all_holdings(self, datetime):
         """
-        It updates portfolio with the latest market values (current holding value and current trailing SL)
-        It updates portfolio money balance: cash, total (cash + open positions), fees
+        It marks all positions to market in a single array operation and records them in the history
+        with the money balance: cash, total (cash + open positions), fees
 
-        Current holding value and trailing SL are either updated when an order get filled or when the market moves
+        The value of a short position is its entry value minus its current value, i.e. its unrealised PnL.
         Money balance is updated when an order get filled
         """
+        self.valuation.update()
 
-        holdings = {
-            symbol: {
-                'open_date': None,
-                'open_price': 0.0,
-                'current_value': 0.0,
-                'is_open': False
-            }
-            for symbol in self.symbol_list
+        # Only symbols with an open position are priced, in one batched request
+        prices = np.zeros(len(self.symbol_list))
+        is_open = np.flatnonzero(self.positions)
+        if is_open.size:
+            prices[is_open] = self.data_handler.current_prices(
+                [self.symbol_list[i] for i in is_open])
+
+        self.exposures = self.valuation.convert(self.positions * prices)
+        market_values = self.exposures + \
+            self.valuation.convert(self.exposition)
+
+        closes = self.data_handler.get_latest_bars_matrix('close')[:, -1]
+        new_bar = datetime != self.risk_bar_datetime
+        if new_bar:
+            self.risk_bar_datetime = datetime
+            self.risk_inputs.update(closes)
+            self.risk_limits.update(closes)
+
+        self.current_holdings['total'] = self.current_holdings['cash'] + \
+            market_values.sum()
+
+        self._record_bar(datetime, market_values)
+        if new_bar:
+            self.metrics.update(self.current_holdings['total'])
+
+        if self.publisher is not None:
+            self.publisher.publish(self._state(market_values))
+
+    def _state(self, market_values):
+        """
+        It returns the state published to Redis: money balance, open trades of each symbol and metrics
+        """
+        state = {
+            'cash': self.current_holdings['cash'],
+            'total': self.current_holdings['total'],
+            'metrics': self.metrics.snapshot()
         }
-        holdings['datetime'] = datetime
-        holdings['cash'] = holdings['total'] = self.current_holdings['cash']
-        holdings['fees'] = self.current_holdings['fees']
-
-        for symbol in self.symbol_list:
-            current_position = self.current_positions[symbol]
-            current_price = self.data_handler.current_price(symbol)
-            market_value = current_position * current_price
-
-            holdings[symbol]['current_value'] = market_value
-            holdings[symbol]['open_price'] = self.current_holdings[symbol]['open_price']
-            holdings[symbol]['open_date'] = self.current_holdings[symbol]['open_date']
-            holdings[symbol]['is_open'] = self.current_holdings[symbol]['is_open']
-            holdings['total'] += market_value
-
-        self.all_holdings.append(holdings)
-
-        # if self.config['run_mode'] != 'backtest':
-        #     with self.redis.pipeline() as pipe:
-        #         pipe.mset({
-        #             "cash": holdings['cash'],
-        #             "total": holdings['total']
-        #         })
-
-        #         for symbol in self.symbol_list:
-        #             is_open = holdings[symbol]['is_open']
-        #             pipe.hmset(f'symbol:{symbol}', {
-        #                 'is_open': int(holdings[symbol]['is_open']),
-        #                 'open_price': holdings[symbol]['open_price'],
-        #                 'open_date': holdings[symbol]['open_date'].isoformat() if is_open else '0',
-        #                 'current_value': holdings[symbol]['current_value']
-        #             })
-        #         pipe.execute()
+
+        for i, symbol in enumerate(self.symbol_list):
+            is_open = self.current_holdings[symbol]['is_open']
+            state[f'symbol:{symbol}'] = {
+                'is_open': int(is_open),
+                'open_price': self.current_holdings[symbol]['open_price'],
+                'open_date': self.current_holdings[symbol]['open_date'].isoformat() if is_open else '0',
+                'current_value': market_values[i]
+            }
+
+        return state
 
     def update_all_positions_holdings(self):
         """
@@ -170,7 +251,6 @@ class Portfolio:
         datetime = self.data_handler.get_latest_bar_datetime(
             self.symbol_list[0])
 
-        self._update_all_positions(datetime)
         self._update_all_holdings(datetime)
 
     def _generate_order(self, signal):
@@ -184,28 +264,51 @@ class Portfolio:
         strength = signal.strength
         self.indicators = signal.indicators
 
-        order_type = 'MKT'
+        order_type = signal.order_type
+        price = signal.price
+
+        current_quantity = self.positions[self.symbol_index[symbol]]
+        fill_cost = self.data_handler.current_prices([symbol])[0]
 
-        current_quantity = self.current_positions[symbol]
-        fill_cost = self.data_handler.current_price(symbol)
+        # No price yet for this symbol, e.g. before its first bar
+        if not fill_cost > 0:
+            return order
 
         # Define the position sizing of the order.
-        # TODO: kelly criterion
-        position_size = self.current_holdings['cash'] * \
-            self.pct_capital_risk * strength
+        position_size = self.sizer.size(
+            symbol, self.current_holdings['cash'], strength)
 
-        if direction == 'LONG' and current_quantity == 0:
-            order_quantity = position_size / fill_cost
+        if direction in self.entry_signals[self.mode] and current_quantity == 0:
+            if not self.risk_limits.check(symbol, 1 if direction == 'LONG' else -1, position_size,
+                                          self.exposures, self.current_holdings['total']):
+                return order
+
+            order_quantity = position_size / \
+                ((price or fill_cost) * self.valuation.rate(symbol))
             order = OrderEvent(symbol, order_type,
-                               order_quantity, fill_cost, 'BUY')
+                               order_quantity, fill_cost, 'BUY' if direction == 'LONG' else 'SHORTSELL', price, oco_id=signal.oco_id)
 
         if direction == 'EXIT' and current_quantity > 0:
             order_quantity = current_quantity
             order = OrderEvent(symbol, order_type,
-                               order_quantity, fill_cost, 'SELL')
+                               order_quantity, fill_cost, 'SELL', price, oco_id=signal.oco_id)
+
+        if direction in ('EXIT', 'EXITSHORT') and current_quantity < 0:
+            order_quantity = -current_quantity
+            order = OrderEvent(symbol, order_type,
+                               order_quantity, fill_cost, 'SHORTCOVER', price, oco_id=signal.oco_id)
+
+        # Resting orders are cancelled once the position of their symbol is closed
+        if order is not None and order_type != 'MKT':
+            self.resting_orders.setdefault(symbol, list()).append(order.order_id)
 
         return order
 
+    def _cancel_resting_orders(self, symbol):
+        for order_id in self.resting_orders.pop(symbol, list()):
+            self.events.put(OrderEvent(symbol, 'CANCEL', 0, 0,
+                                       None, order_id=order_id))
+
     def send_order(self, event):
         if event.type == 'SIGNAL':
             order_event = self._generate_order(event)
@@ -215,85 +318,171 @@ class Portfolio:
 
     def _update_positions_from_fill(self, fill):
         """
-        Takes a Fill object and updates the position matrix to
-        reflect the new position.
+        Takes a Fill object and updates the signed position of its symbol.
 
         Parameters:
           fill: The Fill object to update the positions with.
         """
         fill_dir = 0
-        if fill.direction == 'BUY':
+        if fill.direction == 'BUY' or fill.direction == 'SHORTCOVER':
             fill_dir = 1
-        elif fill.direction == 'SELL':
+        elif fill.direction == 'SELL' or fill.direction == 'SHORTSELL':
             fill_dir = -1
 
-        self.current_positions[fill.symbol] += fill_dir*fill.quantity
+        index = self.symbol_index[fill.symbol]
+        self.positions[index] += fill_dir*fill.quantity
+
+        # Partial fills may not sum up exactly to the position
+        if abs(self.positions[index]) < 1e-9 * fill.quantity:
+            self.positions[index] = 0.0
+
+    def _open_trade(self, fill, direction, cost):
+        """
+        It opens a trade, or adds a partial fill to the trade already open
+        """
+        holdings = self.current_holdings[fill.symbol]
+
+        if holdings['is_open']:
+            holdings['open_price'] += cost
+            self.trade_ledger.increase(
+                fill.symbol, holdings['trade_id'], cost, fill.fees)
+            return
+
+        holdings['close_price'] = 0.0
+        holdings['close_fees'] = 0.0
+        holdings['open_date'] = self.data_handler.get_latest_bar_value(
+            fill.symbol, 'datetime')
+        holdings['open_price'] = cost
+        holdings['is_open'] = True
+        holdings['direction'] = direction
+
+        holdings['trade_id'] = self.trade_ledger.open(
+            fill.symbol,
+            direction,
+            fill.fill_cost,
+            holdings['open_date'],
+            cost,
+            fill.fees,
+            self.indicators
+        )
+
+    def _close_trade(self, fill, cost):
+        """
+        It closes the open trade once its position is fully closed, partial fills being accumulated until then
+        """
+        holdings = self.current_holdings[fill.symbol]
+
+        holdings['close_price'] += cost
+        holdings['close_fees'] += fill.fees
+        if self.positions[self.symbol_index[fill.symbol]] != 0:
+            return
+
+        if holdings['direction'] == 'LONG':
+            returns = holdings['close_price'] / holdings['open_price'] - 1
+        else:
+            returns = holdings['open_price'] / holdings['close_price'] - 1
+
+        holdings['is_open'] = False
+        holdings['direction'] = 'OUT'
+        self._cancel_resting_orders(fill.symbol)
+        self.metrics.record_trade(returns)
+        self.risk_inputs.record_trade(fill.symbol, returns)
+
+        self.trade_ledger.close(
+            fill.symbol,
+            holdings['trade_id'],
+            fill.fill_cost,
+            self.data_handler.get_latest_bar_value(
+                fill.symbol, 'datetime'),
+            holdings['close_price'],
+            holdings['close_fees']
+        )
 
     def _update_holdings_from_fill(self, fill):
         """
-        Takes a Fill object and updates the holdings matrix to reflect the holdings value.
+        Takes a Fill object and updates the holdings to reflect the money balance and the trades.
+        Short sales only pay fees, their entry value is kept as exposition until they are covered.
+        Partial fills add to or reduce the open trade, which is closed once its position is back to 0.
+        Cash and fees are converted into the reporting currency, trades are recorded in the quote currency.
 
         Parameters:
           fill: The Fill object to update the holdings with.
         """
         cost = fill.fill_cost * fill.quantity
+        index = self.symbol_index[fill.symbol]
+        rate = self.valuation.rate(fill.symbol)
+        fees = fill.fees * rate
 
         if fill.direction == 'BUY':
-            self.current_holdings[fill.symbol]['current_value'] += cost
-            self.current_holdings[fill.symbol]['open_date'] = self.data_handler.get_latest_bar_value(
-                fill.symbol, 'datetime')
-            self.current_holdings[fill.symbol]['open_price'] = cost
-            self.current_holdings[fill.symbol]['is_open'] = True
-            self.current_holdings['cash'] -= (cost + fill.fees)
-            self.current_holdings['total'] -= (cost + fill.fees)
-
-            Trade(
-                fill.symbol,
-                'LONG',
-                fill.fill_cost,
-                self.current_holdings[fill.symbol]['open_date'],
-                cost,
-                fill.fees,
-                self.indicators
-            )
+            self.current_holdings['cash'] -= cost * rate + fees
+            self._open_trade(fill, 'LONG', cost)
 
         elif fill.direction == 'SELL':
-            self.current_holdings[fill.symbol]['current_value'] -= cost
-            self.current_holdings[fill.symbol]['is_open'] = False
-            self.current_holdings['cash'] += (cost - fill.fees)
-            self.current_holdings['total'] += (cost - fill.fees)
-
-            Trade.close(
-                self.current_holdings[fill.symbol]['open_date'],
-                fill.fill_cost,
-                self.data_handler.get_latest_bar_value(
-                    fill.symbol, 'datetime'),
-                cost,
-                fill.fees
-            )
-
-        self.current_holdings['fees'] += fill.fees
+            self.current_holdings['cash'] += cost * rate - fees
+            self._close_trade(fill, cost)
+
+        elif fill.direction == 'SHORTSELL':
+            self.current_holdings['cash'] -= fees
+            self.exposition[index] += cost
+            self._open_trade(fill, 'SHORT', cost)
+
+        elif fill.direction == 'SHORTCOVER':
+            # Entry value of the covered part of the position
+            covered = self.exposition[index] * fill.quantity / \
+                (fill.quantity - self.positions[index])
+
+            self.current_holdings['cash'] += (covered - cost) * rate - fees
+            self.exposition[index] -= covered
+            self._close_trade(fill, cost)
+
+        self.current_holdings['total'] -= fees
+        self.current_holdings['fees'] += fees
+
+    def _reject_order(self, fill):
+        """
+        It forgets an order the exchange will never fill
+        """
+        print(f'Order {fill.order_id} {fill.direction} {fill.symbol} rejected')
+
+        resting_orders = self.resting_orders.get(fill.symbol, list())
+        if fill.order_id in resting_orders:
+            resting_orders.remove(fill.order_id)
 
     def update_from_fill(self, event):
         if event.type == 'FILL':
+            if event.status == 'REJECTED':
+                self._reject_order(event)
+                return
+
             self._update_positions_from_fill(event)
             self._update_holdings_from_fill(event)
 
     def create_equity_curve_dataframe(self):
         """
-        Creates a pandas DataFrame from the all_holdings list of dictionaries.
+        Creates a pandas DataFrame on top of the history matrix, without copying it.
         """
-        curve = pd.DataFrame(self.all_holdings)
-        curve.set_index('datetime', inplace=True)
+        curve = pd.DataFrame(
+            self.history[:self.history_size],
+            index=pd.DatetimeIndex(
+                self.history_datetime[:self.history_size], name='datetime'),
+            columns=self.history_columns,
+            copy=False
+        )
         curve['returns'] = curve['total'].pct_change()
         curve['equity_curve'] = (1.0+curve['returns']).cumprod()
 
         self.equity_curve = curve
 
     def generate_trade_record(self):
-        trades = pd.DataFrame(Trade.to_dict())
+        trades = self.trade_ledger.to_frame()
         trades['duration'] = trades['close_date'] - trades['open_date']
-        trades['returns'] = (trades['close_price'] / trades['open_price']) - 1
+
+        is_long = trades['direction'] == 'LONG'
+        trades['returns'] = np.where(
+            is_long,
+            trades['close_price'] / trades['open_price'],
+            trades['open_price'] / trades['close_price']) - 1
+
         trades['win_trades'] = trades['returns'] > 0
         trades['loss_trades'] = trades['returns'] <= 0
 
@@ -303,7 +492,7 @@ class Portfolio:
         """
         Creates a list of summary statistics for the portfolio.
         """
-        total_return = self.equity_curve['equity_curve'][-1]
+        total_return = self.equity_curve['equity_curve'].iloc[-1]
         returns = self.equity_curve['returns']
         pnl = self.equity_curve['equity_curve']
 
@@ -0,0 +1,108 @@
+import queue
+import threading
+
+import redis
+
+
+class StatePublisher:
+    """
+    StatePublisher writes the portfolio state to Redis from a background thread, off the engine hot path.
+
+    A state is a dict of Redis keys to either a scalar (written with SET) or a dict of fields (written with HSET),
+    e.g. {'cash': 1000.0, 'symbol:ETH/BTC': {'is_open': 1, 'open_price': 0.03}}.
+    Each state is diffed against what was last published, and only the changed keys and fields are written,
+    in a single pipeline. States wait in a bounded queue: when Redis is slow or missing the oldest pending state
+    is dropped, as the newest one supersedes it, so publish() never blocks the engine.
+    """
+
+    def __init__(self, client=None, maxsize=16):
+        """
+        Parameters:
+            client: A redis.Redis client, or any object with the same pipeline/set/hset interface
+                    (e.g. a FakeRedis). Connects to the local Redis by default.
+            maxsize: Max number of states waiting to be published.
+        """
+        self.redis = client if client is not None else redis.Redis()
+        self.queue = queue.Queue(maxsize=maxsize)
+
+        # Last successfully published value of each key
+        self.published = dict()
+
+        self.thread = threading.Thread(
+            target=self._run, name='state-publisher', daemon=True)
+        self.thread.start()
+
+    def __repr__(self):
+        return f'<StatePublisher: {self.queue.qsize()} pending states>'
+
+    def publish(self, state):
+        """
+        It queues a state to be published, without blocking
+        """
+        while True:
+            try:
+                self.queue.put_nowait(state)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def close(self, timeout=None):
+        """
+        It stops the background thread once the pending states are published
+        """
+        self.publish(None)
+        self.thread.join(timeout)
+
+    def _diff(self, state):
+        """
+        It returns the keys and fields of state which differ from the last published ones
+        """
+        changes = dict()
+
+        for key, value in state.items():
+            published = self.published.get(key)
+
+            if isinstance(value, dict):
+                published = published or dict()
+                fields = dict((field, field_value) for field, field_value in value.items()
+                              if published.get(field) != field_value)
+                if fields:
+                    changes[key] = fields
+            elif published != value:
+                changes[key] = value
+
+        return changes
+
+    def _write(self, changes):
+        with self.redis.pipeline() as pipe:
+            for key, value in changes.items():
+                if isinstance(value, dict):
+                    pipe.hset(key, mapping=value)
+                else:
+                    pipe.set(key, value)
+            pipe.execute()
+
+        for key, value in changes.items():
+            if isinstance(value, dict):
+                self.published.setdefault(key, dict()).update(value)
+            else:
+                self.published[key] = value
+
+    def _run(self):
+        while True:
+            state = self.queue.get()
+            if state is None:
+                return
+
+            changes = self._diff(state)
+            if not changes:
+                continue
+
+            try:
+                self._write(changes)
+            except Exception as e:
+                # Nothing is marked as published, so these changes are retried with the next state
+                print(f'State publishing failed: {e}')
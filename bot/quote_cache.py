@@ -0,0 +1,116 @@
+from collections import namedtuple
+from concurrent.futures import Future
+
+import threading
+import time
+
+import numpy as np
+
+import ccxt
+
+
+# Top of book of a symbol, stale when it is the cached quote returned after its refresh failed
+Quote = namedtuple('Quote', ['bid', 'ask', 'timestamp', 'fetched_at', 'stale'])
+
+
+class QuoteCache:
+    """
+    QuoteCache keeps the top of book of each symbol for ttl seconds, so the portfolio and the strategies
+    pricing a same symbol within a bar share one order book request.
+
+    Callers missing the cache at the same time (e.g. strategy workers) wait for the request already in flight
+    instead of sending their own. Requests failing with a ccxt network error are retried up to retries times,
+    waiting backoff seconds doubled at each attempt. When all of them fail, the cached quote is returned marked
+    stale, or None when the symbol was never quoted.
+    """
+
+    def __init__(self, fetch, ttl=5.0, retries=2, backoff=0.25):
+        """
+        Parameters:
+            fetch: A function returning the ccxt order book of a symbol.
+            ttl: Number of seconds a quote is served from the cache.
+            retries: Max number of retries of a failed request.
+            backoff: Number of seconds before the first retry.
+        """
+        self.fetch = fetch
+        self.ttl = ttl
+        self.retries = retries
+        self.backoff = backoff
+
+        self.lock = threading.Lock()
+        self.quotes = dict()
+
+        # Future of the request in flight of each symbol
+        self.in_flight = dict()
+
+    def __repr__(self):
+        return f'<QuoteCache: {len(self.quotes)} quotes, {self.ttl}s ttl>'
+
+    def get(self, symbol):
+        """
+        It returns the quote of symbol, from the cache while it is fresh
+        """
+        with self.lock:
+            quote = self.quotes.get(symbol)
+            if quote is not None and time.monotonic() - quote.fetched_at < self.ttl:
+                return quote
+
+            future = self.in_flight.get(symbol)
+            if future is not None:
+                owner = False
+            else:
+                owner = True
+                future = self.in_flight[symbol] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            quote = self._refresh(symbol)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(quote)
+        finally:
+            with self.lock:
+                self.in_flight.pop(symbol, None)
+
+        return quote
+
+    def _refresh(self, symbol):
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+            try:
+                book = self.fetch(symbol)
+            except ccxt.NetworkError as e:
+                error = e
+                continue
+
+            quote = Quote(bid=book['bids'][0][0] if book['bids'] else np.nan,
+                          ask=book['asks'][0][0] if book['asks'] else np.nan,
+                          timestamp=book.get('timestamp'),
+                          fetched_at=time.monotonic(),
+                          stale=False)
+
+            with self.lock:
+                self.quotes[symbol] = quote
+            return quote
+
+        print(f'Quoting {symbol} failed after {self.retries + 1} attempts: {error}')
+
+        with self.lock:
+            quote = self.quotes.get(symbol)
+        return quote._replace(stale=True) if quote is not None else None
+
+    def expire(self, symbol=None):
+        """
+        It expires the cached quote of symbol, or of all symbols, which is kept as the stale fallback of the next request
+        """
+        with self.lock:
+            symbols = list(self.quotes) if symbol is None else [symbol]
+            for symbol in symbols:
+                if symbol in self.quotes:
+                    self.quotes[symbol] = self.quotes[symbol]._replace(fetched_at=-np.inf)
@@ -0,0 +1,130 @@
+import numpy as np
+
+
+class EWCovariance:
+    """
+    EWCovariance keeps an exponentially weighted covariance matrix of the log returns of all symbols,
+    updated in one vectorized step per bar, so the correlation of any pair is available without history.
+    Symbols are indexed like symbol_list.
+    """
+
+    def __init__(self, symbol_list, halflife=100):
+        """
+        Parameters:
+            symbol_list: The symbols to track.
+            halflife: Number of bars after which the weight of a return is halved.
+        """
+        self.symbol_list = symbol_list
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+
+        size = len(self.symbol_list)
+        self.last_prices = np.full(size, np.nan)
+        self.mean = np.zeros(size)
+        self.cov = np.zeros((size, size))
+        self.bars = 0
+
+    def __repr__(self):
+        return f'<EWCovariance: {len(self.symbol_list)} symbols, {self.bars} bars>'
+
+    def update(self, prices):
+        """
+        It adds the latest prices (ordered like symbol_list) to the covariance matrix.
+        The returns of symbols without a valid price, or a previous one, count as 0.
+        """
+        prices = np.asarray(prices, dtype=float)
+        valid = (prices > 0) & (self.last_prices > 0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.where(valid, np.log(prices / self.last_prices), 0.0)
+        self.last_prices = np.where(prices > 0, prices, self.last_prices)
+
+        if not valid.any():
+            return
+
+        delta = returns - self.mean
+        self.mean += self.alpha * delta
+        self.cov = (1 - self.alpha) * \
+            (self.cov + self.alpha * np.outer(delta, delta))
+        self.bars += 1
+
+    def correlation(self):
+        """
+        It returns the correlation matrix, 0 where a symbol has no variance yet
+        """
+        std = np.sqrt(np.diag(self.cov))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.cov / np.outer(std, std)
+
+        return np.nan_to_num(corr)
+
+
+class RiskLimits:
+    """
+    RiskLimits checks the orders opening a position against exposure and correlation caps:
+        - max_exposure: max gross exposure (sum of absolute position values) as a fraction of the portfolio total,
+        - max_correlation: max correlation with an open position in the same direction
+          (or anti-correlation with one in the opposite direction), once min_bars bars are seen.
+    A cap set to None is not checked.
+    """
+
+    def __init__(self, symbol_list, max_exposure=None, max_correlation=None, halflife=100, min_bars=30):
+        """
+        Parameters:
+            symbol_list: The symbols which can hold a position.
+            max_exposure, max_correlation: The caps, None to disable them.
+            halflife: Half-life in bars of the covariance weights.
+            min_bars: Number of bars required before checking correlations.
+        """
+        self.symbol_list = symbol_list
+        self.index = dict((s, i) for i, s in enumerate(self.symbol_list))
+
+        self.max_exposure = max_exposure
+        self.max_correlation = max_correlation
+        self.min_bars = min_bars
+
+        self.covariance = EWCovariance(self.symbol_list, halflife)
+
+    def __repr__(self):
+        return f'<RiskLimits: max exposure {self.max_exposure}, max correlation {self.max_correlation}>'
+
+    def update(self, prices):
+        self.covariance.update(prices)
+
+    def check(self, symbol, direction, value, exposures, total):
+        """
+        It returns True if a new position can be opened.
+
+        Parameters:
+            symbol: The symbol of the order.
+            direction: 1 for a long position, -1 for a short one.
+            value: The value of the position, in the same currency as exposures and total.
+            exposures: The signed value of the positions, indexed like symbol_list.
+            total: The portfolio total.
+        """
+        if self.max_exposure is not None:
+            gross = np.abs(exposures).sum() + value
+            if total <= 0 or gross / total > self.max_exposure:
+                return False
+
+        if self.max_correlation is not None and self.covariance.bars >= self.min_bars:
+            i = self.index[symbol]
+            std = np.sqrt(np.diag(self.covariance.cov))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                corr = np.nan_to_num(
+                    self.covariance.cov[i] / (std[i] * std))
+
+            # Correlation of the new position with each open one, signed by their directions
+            exposure_corr = corr * direction * np.sign(exposures)
+            exposure_corr[i] = 0.0
+
+            if (exposure_corr > self.max_correlation).any():
+                return False
+
+        return True
+
+
+def create_risk_limits(config, symbol_list):
+    """
+    It builds the RiskLimits described by the 'risk' config key, e.g. {"max_exposure": 1, "max_correlation": 0.8}
+    """
+    return RiskLimits(symbol_list, **config.get('risk', dict()))
@@ -0,0 +1,252 @@
+from abc import ABCMeta, abstractmethod
+
+import numpy as np
+
+from helpers import timeframe_to_minutes
+
+
+class RiskInputs:
+    """
+    RiskInputs maintains the inputs of the sizers incrementally, per symbol, so that sizing an order is O(1)
+    whatever the length of the history:
+        - the volatility of bar returns over a rolling window, from running sums over a ring buffer,
+        - the win rate, average win and average loss over a rolling window of closed trades.
+    Symbols are indexed like symbol_list.
+    """
+
+    def __init__(self, symbol_list, window=100, trades_window=50):
+        """
+        Parameters:
+            symbol_list: The symbols to track.
+            window: Number of bar returns in the volatility window.
+            trades_window: Number of closed trades in the trade stats window.
+        """
+        self.symbol_list = symbol_list
+        self.index = dict((s, i) for i, s in enumerate(self.symbol_list))
+
+        size = len(self.symbol_list)
+
+        self.window = window
+        self.last_prices = np.full(size, np.nan)
+        self.returns = np.zeros((size, window))
+        self.returns_pos = np.zeros(size, dtype=int)
+        self.returns_count = np.zeros(size, dtype=int)
+        self.returns_sum = np.zeros(size)
+        self.returns_sumsq = np.zeros(size)
+
+        self.trades_window = trades_window
+        self.trades = np.zeros((size, trades_window))
+        self.trades_pos = np.zeros(size, dtype=int)
+        self.trades_count = np.zeros(size, dtype=int)
+        self.wins = np.zeros(size, dtype=int)
+        self.wins_sum = np.zeros(size)
+        self.losses_sum = np.zeros(size)
+
+    def __repr__(self):
+        return f'<RiskInputs: {len(self.symbol_list)} symbols, {self.window} bars window>'
+
+    def update(self, prices):
+        """
+        It adds the latest prices (ordered like symbol_list) to the volatility windows of all symbols at once.
+        Symbols without a valid price, or a previous one, are left untouched.
+        """
+        prices = np.asarray(prices, dtype=float)
+        valid = (prices > 0) & (self.last_prices > 0)
+
+        rows = np.flatnonzero(valid)
+        if rows.size:
+            returns = np.log(prices[rows] / self.last_prices[rows])
+            cols = self.returns_pos[rows]
+            old = self.returns[rows, cols]
+
+            self.returns[rows, cols] = returns
+            self.returns_sum[rows] += returns - old
+            self.returns_sumsq[rows] += returns ** 2 - old ** 2
+            self.returns_pos[rows] = (cols + 1) % self.window
+            self.returns_count[rows] = np.minimum(
+                self.returns_count[rows] + 1, self.window)
+
+        self.last_prices = np.where(prices > 0, prices, self.last_prices)
+
+    def record_trade(self, symbol, returns):
+        """
+        It adds the returns of a closed trade to the trade stats window of its symbol
+        """
+        i = self.index[symbol]
+        pos = self.trades_pos[i]
+
+        if self.trades_count[i] == self.trades_window:
+            old = self.trades[i, pos]
+            if old > 0:
+                self.wins[i] -= 1
+                self.wins_sum[i] -= old
+            else:
+                self.losses_sum[i] -= old
+        else:
+            self.trades_count[i] += 1
+
+        self.trades[i, pos] = returns
+        if returns > 0:
+            self.wins[i] += 1
+            self.wins_sum[i] += returns
+        else:
+            self.losses_sum[i] += returns
+
+        self.trades_pos[i] = (pos + 1) % self.trades_window
+
+    def volatility(self, symbol):
+        """
+        It returns the standard deviation of the bar returns of symbol over the window, NaN below 2 returns
+        """
+        i = self.index[symbol]
+        count = self.returns_count[i]
+        if count < 2:
+            return np.nan
+
+        mean = self.returns_sum[i] / count
+        variance = (self.returns_sumsq[i] - count * mean ** 2) / (count - 1)
+        return np.sqrt(max(variance, 0.0))
+
+    def trade_stats(self, symbol):
+        """
+        It returns the number of trades, win rate, average win and average loss (positive) of symbol over the window
+        """
+        i = self.index[symbol]
+        count = self.trades_count[i]
+        wins = self.wins[i]
+        losses = count - wins
+
+        win_rate = wins / count if count else np.nan
+        avg_win = self.wins_sum[i] / wins if wins else 0.0
+        avg_loss = -self.losses_sum[i] / losses if losses else 0.0
+
+        return count, win_rate, avg_win, avg_loss
+
+
+class Sizer(metaclass=ABCMeta):
+    """
+    Sizer is an abstract base class providing an interface for all position sizing methods.
+    A sizer returns the amount of cash to commit to a new position.
+    """
+
+    def __init__(self, risk_inputs, pct_capital_risk=1):
+        """
+        Parameters:
+            risk_inputs: The RiskInputs of the portfolio.
+            pct_capital_risk: The maximum fraction of cash committed to a position.
+        """
+        self.risk_inputs = risk_inputs
+        self.pct_capital_risk = pct_capital_risk
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.pct_capital_risk} max of capital>'
+
+    @abstractmethod
+    def size(self, symbol, cash, strength=1.0):
+        """
+        Returns the amount of cash to commit to a new position in symbol
+        """
+        raise NotImplementedError('Should implement size()')
+
+
+class FixedFractionSizer(Sizer):
+    """
+    Commits a fixed fraction of the cash, scaled by the signal strength.
+    """
+
+    def size(self, symbol, cash, strength=1.0):
+        return cash * self.pct_capital_risk * strength
+
+
+class VolatilityTargetSizer(Sizer):
+    """
+    Scales the position so that its annualised volatility matches a target, up to pct_capital_risk of the cash.
+    Falls back to the fixed fraction until the volatility window has enough returns.
+    """
+
+    def __init__(self, risk_inputs, pct_capital_risk=1, target_volatility=0.5, periods=365*24*60):
+        """
+        Parameters:
+            target_volatility: The annualised volatility targeted for each position.
+            periods: Number of bars per year used to annualise the volatility, markets trading 24/7.
+        """
+        super().__init__(risk_inputs, pct_capital_risk)
+        self.target_volatility = target_volatility
+        self.periods = periods
+
+    def size(self, symbol, cash, strength=1.0):
+        volatility = self.risk_inputs.volatility(symbol) * np.sqrt(self.periods)
+
+        fraction = self.pct_capital_risk
+        if volatility > 0:
+            fraction = min(self.target_volatility / volatility,
+                           self.pct_capital_risk)
+
+        return cash * fraction * strength
+
+
+class KellySizer(Sizer):
+    """
+    Commits a fraction of the Kelly criterion W - (1 - W) / R, computed from the rolling trade stats of the symbol,
+    W being the win rate and R the average win / average loss ratio, up to pct_capital_risk of the cash.
+    Falls back to the fixed fraction until min_trades trades are closed.
+    """
+
+    def __init__(self, risk_inputs, pct_capital_risk=1, kelly_fraction=0.5, min_trades=20):
+        """
+        Parameters:
+            kelly_fraction: The fraction of the Kelly criterion committed, e.g. 0.5 for half-Kelly.
+            min_trades: Number of closed trades required before using the Kelly criterion.
+        """
+        super().__init__(risk_inputs, pct_capital_risk)
+        self.kelly_fraction = kelly_fraction
+        self.min_trades = min_trades
+
+    def size(self, symbol, cash, strength=1.0):
+        count, win_rate, avg_win, avg_loss = self.risk_inputs.trade_stats(
+            symbol)
+
+        if count < self.min_trades:
+            return cash * self.pct_capital_risk * strength
+
+        if avg_loss == 0:
+            kelly = 1.0
+        elif avg_win == 0:
+            kelly = 0.0
+        else:
+            kelly = win_rate - (1 - win_rate) / (avg_win / avg_loss)
+
+        fraction = min(max(self.kelly_fraction * kelly, 0.0),
+                       self.pct_capital_risk)
+
+        return cash * fraction * strength
+
+
+sizers = {
+    'fixed_fraction': FixedFractionSizer,
+    'volatility_target': VolatilityTargetSizer,
+    'kelly': KellySizer
+}
+
+
+def create_sizer(config, symbol_list, pct_capital_risk=1):
+    """
+    It builds the sizer described by the 'sizing' config key, e.g. {"method": "kelly", "kelly_fraction": 0.5},
+    and its RiskInputs. The 'window' and 'trades_window' keys size the RiskInputs windows, the other keys are
+    passed to the sizer. Defaults to the fixed fraction sizer.
+    The volatility is annualised with the number of bars per year of the configured timeframe.
+    """
+    params = dict(config.get('sizing', dict()))
+    method = params.pop('method', 'fixed_fraction')
+
+    if method not in sizers:
+        raise ValueError(f'Unknown sizing method: {method}')
+
+    if method == 'volatility_target' and 'periods' not in params and 'timeframe' in config:
+        params['periods'] = 365*24*60 / timeframe_to_minutes(config['timeframe'])
+
+    risk_inputs = RiskInputs(symbol_list,
+                             window=params.pop('window', 100),
+                             trades_window=params.pop('trades_window', 50))
+
+    return sizers[method](risk_inputs, pct_capital_risk, **params)
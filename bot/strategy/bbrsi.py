@@ -9,7 +9,8 @@ import pandas as pd
 from talib import RSI, EMA, BBANDS, MA_Type
 from custom_indicators import BULL_DIV_2, BULL_DIV_RSI_2, BEAR_DIV_2, BEAR_DIV_RSI_2, HBULL_DIV_2, HBULL_DIV_RSI_2
 
-from helpers import stop_loss, init_trailing_long
+from helpers import stop_loss
+from trailing_stops import TrailingStops
 
 from math import floor
 
@@ -24,7 +25,6 @@ class BBRSI(Strategy):
         self.portfolio = portfolio
 
         self.data_points = 4*24*7*10
-        self.counter = 0
 
         self.bars_window = 250
 
@@ -40,27 +40,33 @@ class BBRSI(Strategy):
 
         self.sell_signal = 0
         self.stop_loss = None
-        self.trailing = None
-
-        self.open_price = None
+        self.stops = TrailingStops(self.events, self.symbol_list)
 
         self.position = self._calculate_initial_position()
 
+        # Bars needed by each indicator, pre-rolled by the engine before the first signal
+        self.lookback = {
+            'weekly_ema': self.data_points,
+            'bars': self.bars_window
+        }
+
     def _calculate_initial_position(self):
         position = dict((s, 'OUT') for s in self.symbol_list)
         return position
 
-    def _calculate_initial_trailing(self):
-        trailing = dict((s, None) for s in self.symbol_list)
-        return trailing
-
     def calculate_signals(self):
-        for symbol in self.symbol_list:
+        # Trailing stops of all open positions are checked in one step before looking for new signals
+        exited = self.stops.check(
+            self.data_handler.get_latest_bars_matrix('close')[:, -1],
+            self.data_handler.get_latest_bar_datetime(self.symbol_list[0])
+        )
+        for symbol in exited:
+            self.position[symbol] = 'OUT'
+            self.sell_signal = 0
 
-            # Gather enough data points to perform indicators calculations
-            if self.counter < self.data_points:
-                self.counter += 1
-                break
+        for symbol in self.symbol_list:
+            if symbol in exited:
+                continue
 
             # Init signal infos
             signal_datetime = self.data_handler.get_latest_bar(
@@ -131,9 +137,8 @@ class BBRSI(Strategy):
                             )
                             self.events.put(signal)
                             self.position[symbol] = signal_type
-                            self.open_price = current_close
-                            self.trailing = init_trailing_long(
-                                current_close, 0.02, 0.05)
+                            self.stops.open(
+                                symbol, 'LONG', current_close, pct_sl=0.02, pct_tp=0.05)
                             break
 
                     if ma_short > ma_long:
@@ -154,12 +159,11 @@ class BBRSI(Strategy):
                                 signal_type=signal_type,
                                 strength=div_price['nb_div'],
                                 indicators=div_price['local_min']
-                              )
+                              )
                             self.events.put(signal)
                             self.position[symbol] = signal_type
-                            self.open_price = current_close
-                            self.trailing = init_trailing_long(
-                                current_close, 0.02, 0.05)
+                            self.stops.open(
+                                symbol, 'LONG', current_close, pct_sl=0.02, pct_tp=0.05)
                             break
 
                 if is_bearish:
@@ -203,29 +207,13 @@ class BBRSI(Strategy):
                     nbdevup=self.bb_std,
                     nbdevdn=self.bb_std)
 
-                trailing = self.trailing(current_close)
-
-                if current_close <= trailing:
-
-                    signal_type = 'EXIT'
-
-                    signal = SignalEvent(
-                        symbol=symbol,
-                        datetime=signal_datetime,
-                        signal_type=signal_type
-                    )
-                    self.events.put(signal)
-                    self.position[symbol] = 'OUT'
-                    self.sell_signal = 0
-                    break
-
                 if (current_high >= upper[-1] and current_close > current_open):
                     self.sell_signal += 1
 
                     if self.sell_signal < 1:
                         break
 
-                    if current_close > self.open_price:
+                    if current_close > self.stops.get_open_price(symbol):
                         print(f'{symbol} - WIN: {signal_datetime}')
                         print('Sell Signal: ', self.sell_signal)
 
@@ -242,6 +230,7 @@ class BBRSI(Strategy):
                     )
                     self.events.put(signal)
                     self.position[symbol] = 'OUT'
+                    self.stops.close(symbol)
                     self.sell_signal = 0
                     break
 
@@ -258,7 +247,7 @@ class BBRSI(Strategy):
                     if self.sell_signal <= 1:
                         break
 
-                    if current_close < self.open_price:
+                    if current_close < self.stops.get_open_price(symbol):
                         print(f'{symbol} - WIN: {signal_datetime}')
                         print('Sell Signal: ', self.sell_signal)
 
@@ -275,5 +264,6 @@ class BBRSI(Strategy):
                     )
                     self.events.put(signal)
                     self.position[symbol] = 'OUT'
+                    self.stops.close(symbol)
                     self.sell_signal = 0
                     break
@@ -24,7 +24,6 @@ class BBRSI(Strategy):
         self.portfolio = portfolio
 
         self.data_points = 250
-        self.counter = 0
 
         self.div_window = 30
         self.rsi_window = 14
@@ -40,6 +39,12 @@ class BBRSI(Strategy):
 
         self.position = self._calculate_initial_position()
 
+        # Bars needed by each indicator, pre-rolled by the engine before the first signal
+        self.lookback = {
+            'ema_long': self.ma_long,
+            'bars': self.data_points
+        }
+
     def _calculate_initial_position(self):
         position = dict((s, 'OUT') for s in self.symbol_list)
         return position
@@ -51,11 +56,6 @@ class BBRSI(Strategy):
     def calculate_signals(self):
         for symbol in self.symbol_list:
 
-            # Gather enough data points to perform indicators calculations
-            if self.counter < self.data_points:
-                self.counter += 1
-                break
-
             # Init signal infos
             signal_datetime = self.data_handler.get_latest_bar(
                 symbol).Index
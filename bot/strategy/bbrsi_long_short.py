@@ -23,8 +23,6 @@ class BBRSI(Strategy):
 
         self.portfolio = portfolio
 
-        self.counter = 0
-
         self.bars_window = 250
         self.div_window = 30
         self.rsi_window = 14
@@ -46,6 +44,12 @@ class BBRSI(Strategy):
 
         self.position = self._calculate_initial_position()
 
+        # Bars needed by each indicator, pre-rolled by the engine before the first signal
+        self.lookback = {
+            'weekly_trend': self.data_points,
+            'bars': self.bars_window
+        }
+
     def _calculate_initial_position(self):
         position = dict((s, 'OUT') for s in self.symbol_list)
         return position
@@ -57,11 +61,6 @@ class BBRSI(Strategy):
     def calculate_signals(self):
         for symbol in self.symbol_list:
 
-            # Gather enough data points to perform indicators calculations
-            if self.counter < self.data_points:
-                self.counter += 1
-                break
-
             # Init signal infos
             signal_datetime = self.data_handler.get_latest_bar(
                 symbol).Index
@@ -29,8 +29,6 @@ class BBRSI(Strategy):
 
         self.portfolio = portfolio
 
-        self.counter = 0
-
         self.bars_window = 250
         self.div_window = 200
         self.rsi_window = 14
@@ -55,6 +53,12 @@ class BBRSI(Strategy):
 
         self.position = self._calculate_initial_position()
 
+        # Bars needed by each indicator, pre-rolled by the engine before the first signal
+        self.lookback = {
+            'weekly_trend': self.data_points,
+            'bars': self.bars_window
+        }
+
         self.is_div = None
         self.div_signal = 0
         self.buy_signal = 0
@@ -70,11 +74,6 @@ class BBRSI(Strategy):
     def calculate_signals(self):
         for symbol in self.symbol_list:
 
-            # Gather enough data points to perform indicators calculations
-            if self.counter < self.data_points:
-                self.counter += 1
-                break
-
             # Init signal infos
             signal_datetime = self.data_handler.get_latest_bar(
                 symbol).Index
@@ -24,7 +24,6 @@ class BBRSI(Strategy):
         self.portfolio = portfolio
 
         self.data_points = 4*24*20
-        self.counter = 0
 
         self.bars_window = 250
 
@@ -46,6 +45,12 @@ class BBRSI(Strategy):
 
         self.position = self._calculate_initial_position()
 
+        # Bars needed by each indicator, pre-rolled by the engine before the first signal
+        self.lookback = {
+            'weekly_ema': self.data_points,
+            'bars': 250
+        }
+
     def _calculate_initial_position(self):
         position = dict((s, 'OUT') for s in self.symbol_list)
         return position
@@ -57,11 +62,6 @@ class BBRSI(Strategy):
     def calculate_signals(self):
         for symbol in self.symbol_list:
 
-            # Gather enough data points to perform indicators calculations
-            if self.counter < self.data_points:
-                self.counter += 1
-                break
-
             # Init signal infos
             signal_datetime = self.data_handler.get_latest_bar(
                 symbol).Index
@@ -6,11 +6,12 @@ import numpy as np
 import pandas as pd
 
 from datetime import datetime
-from talib import RSI, EMA
+from batch_indicators import rsi, ema
 from custom_indicators import bull_div, bear_div, hbull_div, hbear_div
 from helpers import load_config
 
 from telegram import TelegramBot
+from strategy.executor import SymbolExecutor
 
 
 class BBRSI(Strategy):
@@ -22,8 +23,6 @@ class BBRSI(Strategy):
         self.symbol_list = self.data_handler.symbol_list
         self.portfolio = portfolio
 
-        self.counter = 0
-
         self.bars_window = 200
         self.rsi_window = 14
         self.div_window = 200
@@ -31,131 +30,129 @@ class BBRSI(Strategy):
         self.ma_short = 20
         self.ma_long = 90
 
+        # Bars needed by each indicator, pre-rolled by the engine before the first signal
+        self.lookback = {
+            'bars': self.bars_window
+        }
+
         self.telegram = TelegramBot(
             bot_token=self.config['telegram']['bot_token'],
             channel_id=self.config['telegram']['channel_id'])
 
+        # Opt-in thread pool to evaluate symbols concurrently (0 = sequential)
+        self.executor = SymbolExecutor(
+            max_workers=self.config.get('strategy_workers', 0))
+
+    def close(self):
+        self.executor.shutdown()
+
     def calculate_signals(self):
-        for symbol in self.symbol_list:
+        # Indicators are computed for all symbols at once on (symbols x bars_window) matrices
+        timestamps = self.data_handler.get_latest_bars_matrix(
+            'datetime', N=self.bars_window)
+
+        highs = self.data_handler.get_latest_bars_matrix(
+            'high', N=self.bars_window)
+
+        lows = self.data_handler.get_latest_bars_matrix(
+            'low', N=self.bars_window)
+
+        closes = self.data_handler.get_latest_bars_matrix(
+            'close', N=self.bars_window)
+
+        hlc3 = (highs + lows + closes) / 3
+
+        rsi_values = rsi(closes, timeperiod=self.rsi_window)
+
+        ma_shorts = ema(hlc3, timeperiod=self.ma_short)[:, -1]
+        ma_longs = ema(hlc3, timeperiod=self.ma_long)[:, -1]
+
+        def evaluate(i, symbol):
+            return self._evaluate_symbol(
+                symbol,
+                timestamps,
+                highs[i],
+                lows[i],
+                rsi_values[i],
+                ma_shorts[i],
+                ma_longs[i]
+            )
+
+        # Signals are sent in symbol order once every symbol is evaluated
+        for symbol, signal in zip(self.symbol_list, self.executor.map(evaluate, self.symbol_list)):
             print(f'Searching for {symbol} signals ...')
-            timestamps = self.data_handler.get_latest_bars_values(
-                symbol, 'datetime', N=self.bars_window)
-
-            highs = self.data_handler.get_latest_bars_values(
-                symbol, 'high', N=self.bars_window)
-
-            lows = self.data_handler.get_latest_bars_values(
-                symbol, 'low', N=self.bars_window)
-
-            closes = self.data_handler.get_latest_bars_values(
-                symbol, 'close', N=self.bars_window)
-
-            hlc3 = (highs + lows + closes) / 3
-
-            signal_timestamp = timestamps[-1]
-
-            rsi = RSI(closes, timeperiod=self.rsi_window)
-
-            ma_short = EMA(hlc3, timeperiod=self.ma_short)[-1]
-            ma_long = EMA(hlc3, timeperiod=self.ma_long)[-1]
-
-            # Buy Signal conditions
-            if ma_short < ma_long:
-                trend = 'Short-term bearish'
-                print(f'{symbol}: {trend}')
-
-                bullish_div = bull_div(
-                    lows,
-                    rsi,
-                    timestamps,
-                    window=self.div_window,
-                    price_prominence=ma_long*0.001,
-                )
-
-                hbearish_div = hbear_div(
-                    highs,
-                    rsi,
-                    timestamps,
-                    window=self.div_window,
-                    price_prominence=ma_long*0.001,
-                )
-
-                if bullish_div and len(bullish_div) > 1:
-                    div_type = 'BULLISH'
-                    print(
-                        f'{symbol} - {div_type}: {signal_timestamp}')
-
-                    self.telegram.send_text({
-                        'symbol': symbol,
-                        'timeframe': self.data_handler.timeframe,
-                        'div_type': div_type,
-                        'peaks': bullish_div,
-                        'trend': trend,
-                        'ma_short': ma_short,
-                        'ma_long': ma_long
-                    })
-
-                elif hbearish_div and len(hbearish_div) > 1:
-                    div_type = 'HIDDEN BEARISH'
-                    print(
-                        f'{symbol} - {div_type}: {signal_timestamp}')
-
-                    self.telegram.send_text({
-                        'symbol': symbol,
-                        'timeframe': self.data_handler.timeframe,
-                        'div_type': div_type,
-                        'peaks': hbearish_div,
-                        'trend': trend,
-                        'ma_short': ma_short,
-                        'ma_long': ma_long
-                    })
-
-            elif ma_short > ma_long:
-                trend = 'Short-term bullish'
-                print(f'{symbol}: {trend}')
-
-                bearish_div = bear_div(
-                    highs,
-                    rsi,
-                    timestamps,
-                    window=self.div_window,
-                    price_prominence=ma_long*0.001,
-                )
-
-                hbullish_div = hbull_div(
-                    lows,
-                    rsi,
-                    timestamps,
-                    window=self.div_window,
-                    price_prominence=ma_long*0.001,
-                )
-
-                if bearish_div and len(bearish_div) > 1:
-                    div_type = 'BEARISH'
-                    print(
-                        f'{symbol} - {div_type}: {signal_timestamp}')
-
-                    self.telegram.send_text({
-                        'symbol': symbol,
-                        'timeframe': self.data_handler.timeframe,
-                        'div_type': div_type,
-                        'peaks': bearish_div,
-                        'trend': trend,
-                        'ma_short': ma_short,
-                        'ma_long': ma_long
-                    })
-
-                elif hbullish_div and len(hbullish_div) > 1:
-                    div_type = 'HIDDEN BULLISH'
-                    print(
-                        f'{symbol} - {div_type}: {signal_timestamp}')
-
-                    self.telegram.send_text({
-                        'symbol': symbol,
-                        'timeframe': self.data_handler.timeframe,
-                        'div_type': div_type,
-                        'peaks': hbullish_div,
-                        'trend': trend,
-                        'ma_short': ma_short,
-                        'ma_long': ma_long
-                    })
+
+            if signal is None:
+                continue
+
+            print(f'{symbol}: {signal["trend"]}')
+            print(f'{symbol} - {signal["div_type"]}: {timestamps[-1]}')
+            self.telegram.send_text(signal)
+
+    def _evaluate_symbol(self, symbol, timestamps, highs, lows, rsi, ma_short, ma_long):
+        """
+        It looks for divergences on a single symbol and returns the signal message, or None.
+        It does not touch any shared state, so it can safely run on the executor threads.
+        """
+        if ma_short < ma_long:
+            trend = 'Short-term bearish'
+
+            bullish_div = bull_div(
+                lows,
+                rsi,
+                timestamps,
+                window=self.div_window,
+                price_prominence=ma_long*0.001,
+            )
+
+            if bullish_div and len(bullish_div) > 1:
+                return self._signal_message(symbol, 'BULLISH', bullish_div, trend, ma_short, ma_long)
+
+            hbearish_div = hbear_div(
+                highs,
+                rsi,
+                timestamps,
+                window=self.div_window,
+                price_prominence=ma_long*0.001,
+            )
+
+            if hbearish_div and len(hbearish_div) > 1:
+                return self._signal_message(symbol, 'HIDDEN BEARISH', hbearish_div, trend, ma_short, ma_long)
+
+        elif ma_short > ma_long:
+            trend = 'Short-term bullish'
+
+            bearish_div = bear_div(
+                highs,
+                rsi,
+                timestamps,
+                window=self.div_window,
+                price_prominence=ma_long*0.001,
+            )
+
+            if bearish_div and len(bearish_div) > 1:
+                return self._signal_message(symbol, 'BEARISH', bearish_div, trend, ma_short, ma_long)
+
+            hbullish_div = hbull_div(
+                lows,
+                rsi,
+                timestamps,
+                window=self.div_window,
+                price_prominence=ma_long*0.001,
+            )
+
+            if hbullish_div and len(hbullish_div) > 1:
+                return self._signal_message(symbol, 'HIDDEN BULLISH', hbullish_div, trend, ma_short, ma_long)
+
+        return None
+
+    def _signal_message(self, symbol, div_type, peaks, trend, ma_short, ma_long):
+        return {
+            'symbol': symbol,
+            'timeframe': self.data_handler.timeframe,
+            'div_type': div_type,
+            'peaks': peaks,
+            'trend': trend,
+            'ma_short': ma_short,
+            'ma_long': ma_long
+        }
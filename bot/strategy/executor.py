@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class SymbolExecutor:
+    """
+    SymbolExecutor evaluates independent per-symbol signal logic, either one symbol after another or on a thread pool.
+    TA-Lib, NumPy and SciPy kernels release the GIL for most of their work, so evaluations overlap in live mode.
+    Results are always returned in symbol order, so signals reach the event queue deterministically.
+    """
+
+    def __init__(self, max_workers=0):
+        """
+        Parameters:
+            max_workers: Number of threads of the pool. 0 or 1 evaluates symbols sequentially (default).
+        """
+        self.max_workers = max_workers
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='signals') if max_workers > 1 else None
+
+    def __repr__(self):
+        return f'<SymbolExecutor: {self.max_workers} workers>'
+
+    def map(self, evaluate, symbols):
+        """
+        It calls evaluate(index, symbol) for each symbol and returns the results as a list ordered like symbols.
+        An exception raised by an evaluation is re-raised here once all evaluations are done,
+        the one of the first failing symbol in symbols order.
+        """
+        if self.pool is None:
+            return [evaluate(i, symbol) for i, symbol in enumerate(symbols)]
+
+        futures = [self.pool.submit(evaluate, i, symbol)
+                   for i, symbol in enumerate(symbols)]
+        wait(futures)
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        """
+        It stops the threads of the pool once the pending evaluations are done
+        """
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
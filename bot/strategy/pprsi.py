@@ -6,9 +6,10 @@ import queue
 import numpy as np
 
 from talib import RSI, EMA
-from custom_indicators import PPSR
+from pivots import PivotPoints
 
-from helpers import get_prev_daily_hlc, init_trailing_long, init_trailing_short
+from helpers import timeframe_to_minutes
+from trailing_stops import TrailingStops
 
 
 class PPRSI(Strategy):
@@ -22,12 +23,24 @@ class PPRSI(Strategy):
         self.timeframe = self.data_handler.timeframe
 
         self.data_points = 50
-        self.counter = 0
 
-        self.trailing = self._calculate_initial_trailing()
+        # Up to two days of bars are needed to close a full day of pivots
+        self.pivot_points = 2 * 24 * 60 // timeframe_to_minutes(self.timeframe)
+
+        self.pivots = PivotPoints(self.symbol_list, history=self.pivot_points)
+
+        # Shorts are closed with an 'EXIT' signal by the short portfolio
+        self.stops = TrailingStops(
+            self.events, self.symbol_list, short_exit='EXIT')
         self.position = self._calculate_initial_position()
         self.pullback = self._calculate_initial_pullback()
 
+        # Bars needed by each indicator, pre-rolled by the engine before the first signal
+        self.lookback = {
+            'rsi': self.data_points,
+            'daily_pivots': self.pivot_points
+        }
+
     def _calculate_initial_position(self):
         position = dict((s, 'OUT') for s in self.symbol_list)
         return position
@@ -36,17 +49,22 @@ class PPRSI(Strategy):
         pullback = dict((s, 0) for s in self.symbol_list)
         return pullback
 
-    def _calculate_initial_trailing(self):
-        trailing = dict((s, None) for s in self.symbol_list)
-        return trailing
-
     def calculate_signals(self):
-        for symbol in self.symbol_list:
+        # Daily pivots only change once per day, they are aggregated here and read in O(1) below
+        self.pivots.update_from(self.data_handler)
+
+        # Trailing stops of all open positions are checked in one step before looking for new signals
+        exited = self.stops.check(
+            self.data_handler.get_latest_bars_matrix('close')[:, -1],
+            self.data_handler.get_latest_bar_datetime(self.symbol_list[0])
+        )
+        for symbol in exited:
+            print(f'{symbol} - STOP LOSS')
+            self.position[symbol] = 'OUT'
 
-            # Gather enough data points to perform indicators calculations
-            if self.counter < self.data_points:
-                self.counter += 1
-                break
+        for symbol in self.symbol_list:
+            if symbol in exited:
+                continue
 
             latest_closes = self.data_handler.get_latest_bars_values(
                 symbol, 'close', N=self.data_points)
@@ -59,28 +77,10 @@ class PPRSI(Strategy):
             # Buy Signal conditions
             if self.position[symbol] == 'OUT':
 
-                # Init OHLCV bars and indicators
-                latest_datetimes = self.data_handler.get_latest_bars_values(
-                    symbol, 'datetime', N=self.data_points)
-                latest_highs = self.data_handler.get_latest_bars_values(
-                    symbol, 'high', N=self.data_points)
-
-                latest_opens = self.data_handler.get_latest_bars_values(
-                    symbol, 'open', N=self.data_points)
-                current_open = latest_opens[-1]
-
-                latest_lows = self.data_handler.get_latest_bars_values(
-                    symbol, 'low', N=self.data_points)
-
-                pp, s1, s2, s3, r1, r2, r3 = PPSR(
-                    *get_prev_daily_hlc(
-                        self.timeframe,
-                        latest_datetimes,
-                        latest_highs,
-                        latest_lows,
-                        latest_closes
-                    )
-                )
+                pivot_levels = self.pivots.get(symbol, 'D')
+                if pivot_levels is None:
+                    continue
+                pp = pivot_levels.pp
 
                 rsi = RSI(latest_closes)[-1]
                 ma = EMA(latest_closes, timeperiod=3)[-1]
@@ -104,26 +104,11 @@ class PPRSI(Strategy):
                     self.events.put(signal)
                     self.position[symbol] = 'SHORT'
                     self.pullback[symbol] = 0
-                    self.trailing[symbol] = init_trailing_short(
+                    self.stops.open(
+                        symbol,
+                        'SHORT',
                         current_close,
                         pct_sl=0.04,
                         pct_tp=0.08
                     )
                     break
-
-            elif self.position[symbol] == 'SHORT':
-                trailing_ls = self.trailing[symbol](current_close)
-
-                print(
-                    self.portfolio.current_holdings[symbol]['open_price'], current_close, trailing_ls)
-                if current_close >= trailing_ls:
-                    print(f'{symbol} - STOP LOSS: {signal_datetime}')
-                    signal_type = 'EXIT'
-
-                    signal = SignalEvent(
-                        symbol=symbol,
-                        datetime=signal_datetime,
-                        signal_type=signal_type
-                    )
-                    self.events.put(signal)
-                    self.position[symbol] = 'OUT'
@@ -14,3 +14,17 @@ class Strategy(metaclass=ABCMeta):
         Provides the mechanisms to calculate the list of signals.
         """
         raise NotImplementedError("Should implement calculate_signals()")
+
+    def required_lookback(self):
+        """
+        Returns the number of bars the engine pre-rolls before the first calculate_signals() call.
+        Strategies declare the bars needed by each indicator in self.lookback, e.g. {'rsi': 15, 'ema_long': 90}.
+        """
+        return max(getattr(self, 'lookback', dict()).values(), default=0)
+
+    def close(self):
+        """
+        Called when the run exits, to release what the strategy holds (e.g. worker threads).
+        Strategies holding nothing have nothing to do.
+        """
+        pass
@@ -0,0 +1,184 @@
+import argparse
+import asyncio
+import json
+import time
+
+import websockets
+
+from fake_exchange import FakeExchange
+from helpers import timeframe_to_minutes
+
+
+class StreamReplayServer:
+    """
+    StreamReplayServer is a local stand-in of the exchange WebSocket streams, in the Binance combined-stream format,
+    replaying the candles of a FakeExchange, so the StreamDataHandler can be run offline.
+
+    Clients subscribe to '<symbol id>@kline_<timeframe>' and '<symbol id>@bookTicker' streams with a SUBSCRIBE
+    message. Every interval seconds the forming candle of each subscribed symbol is closed, the exchange clock
+    advances one bar, and the new forming candle and top of book are sent.
+    With drop_every, all connections are dropped every drop_every bars, to exercise reconnects and gap backfills.
+    """
+
+    def __init__(self, exchange, symbol_list, host='localhost', port=8765, interval=1.0, drop_every=None):
+        """
+        Parameters:
+            exchange: The FakeExchange replayed, also serving the REST requests of the clients.
+            symbol_list: The symbols which can be subscribed to.
+            interval: Number of seconds between two candle closes.
+            drop_every: Number of bars between two connection drops, None to never drop.
+        """
+        self.exchange = exchange
+        self.symbol_list = symbol_list
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.drop_every = drop_every
+
+        self.timeframe = self.exchange.timeframe
+        self.duration = timeframe_to_minutes(self.timeframe) * 60 * 1000
+        self.stream_ids = dict((''.join(symbol.split('/')).lower(), symbol)
+                               for symbol in self.symbol_list)
+
+        # Subscribed streams of each connection
+        self.clients = dict()
+
+        self.bars = 0
+        self.update_id = 0
+
+    def __repr__(self):
+        return f'<StreamReplayServer: ws://{self.host}:{self.port}, {len(self.clients)} clients>'
+
+    async def handler(self, websocket, *args):
+        self.clients[websocket] = set()
+
+        try:
+            async for message in websocket:
+                request = json.loads(message)
+                if request.get('method') == 'SUBSCRIBE':
+                    self.clients[websocket].update(request['params'])
+                    await websocket.send(json.dumps({'result': None, 'id': request.get('id')}))
+                    await self._send_forming(websocket)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.clients.pop(websocket, None)
+
+    def _kline(self, stream_id, bar, closed):
+        return {
+            'stream': f'{stream_id}@kline_{self.timeframe}',
+            'data': {
+                'e': 'kline',
+                'E': int(time.time() * 1000),
+                's': stream_id.upper(),
+                'k': {
+                    't': int(bar[0]),
+                    'T': int(bar[0]) + self.duration - 1,
+                    's': stream_id.upper(),
+                    'i': self.timeframe,
+                    'o': str(bar[1]),
+                    'h': str(bar[2]),
+                    'l': str(bar[3]),
+                    'c': str(bar[4]),
+                    'v': str(bar[5]),
+                    'x': closed
+                }
+            }
+        }
+
+    def _book_ticker(self, stream_id):
+        ticker = self.exchange._fetch_ticker(self.stream_ids[stream_id])
+        self.update_id += 1
+
+        return {
+            'stream': f'{stream_id}@bookTicker',
+            'data': {
+                'u': self.update_id,
+                's': stream_id.upper(),
+                'b': str(ticker['bid']),
+                'B': str(ticker['baseVolume']),
+                'a': str(ticker['ask']),
+                'A': str(ticker['baseVolume'])
+            }
+        }
+
+    def _messages(self, streams, closed):
+        """
+        It returns the messages of the subscribed streams: the closing or the forming candles, and the top of book
+        """
+        messages = list()
+
+        for stream in streams:
+            stream_id, name = stream.split('@')
+            if stream_id not in self.stream_ids:
+                continue
+
+            if name == f'kline_{self.timeframe}':
+                bar = self.exchange._bars(self.stream_ids[stream_id])[-1]
+                messages.append(self._kline(stream_id, bar, closed))
+            elif name == 'bookTicker' and not closed:
+                messages.append(self._book_ticker(stream_id))
+
+        return messages
+
+    async def _send(self, websocket, messages):
+        try:
+            for message in messages:
+                await websocket.send(json.dumps(message))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _send_forming(self, websocket):
+        await self._send(websocket, self._messages(self.clients.get(websocket, ()), closed=False))
+
+    async def tick(self):
+        """
+        It closes the forming candles, advances the exchange one bar, and sends the new forming candles
+        """
+        clients = list(self.clients.items())
+
+        for websocket, streams in clients:
+            await self._send(websocket, self._messages(streams, closed=True))
+
+        self.exchange.advance()
+        self.bars += 1
+
+        if self.drop_every and self.bars % self.drop_every == 0:
+            for websocket, _ in clients:
+                await websocket.close()
+            return
+
+        for websocket, _ in clients:
+            await self._send_forming(websocket)
+
+    async def run(self, bars=None):
+        """
+        It serves the streams for bars bars, or forever
+        """
+        async with websockets.serve(self.handler, self.host, self.port):
+            while bars is None or self.bars < bars:
+                await asyncio.sleep(self.interval)
+                await self.tick()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Replay exchange_data as exchange WebSocket streams")
+
+    parser.add_argument('-n', '--symbols', type=int, default=10,
+                        help='Number of synthetic symbols (FAKE<i>/BTC)')
+    parser.add_argument('-t', '--timeframe', type=str, default='1h',
+                        help='Timeframe of the replayed data')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='Port to listen on')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='Number of seconds between two candle closes')
+    parser.add_argument('--drop-every', type=int, default=None,
+                        help='Number of bars between two connection drops')
+
+    args = parser.parse_args()
+
+    symbol_list = FakeExchange.synthetic_symbols(args.symbols)
+    server = StreamReplayServer(FakeExchange(timeframe=args.timeframe, symbols=symbol_list), symbol_list,
+                                port=args.port, interval=args.interval, drop_every=args.drop_every)
+    asyncio.run(server.run())
@@ -1,54 +1,89 @@
-class Trade:
-
-    trades = list()
-
-    def __init__(self, symbol, direction, open_market_price, open_date, open_price, open_fees, indicators):
-        self.symbol = symbol
-        self.open_market_price = open_market_price
-        self.is_open = True
-
-        self.open_price = open_price
-        self.open_date = open_date
-        self.open_fees = open_fees
-
-        self.close_market_price = None
-        self.close_price = None
-        self.close_date = None
-        self.close_fees = None
-        self.direction = direction
-
-        self.indicators = indicators
-
-        self.trades.append(self)
-
-    @classmethod
-    def close(self, open_date, close_market_price, close_date, close_price, close_fees):
-        trade = [trade for trade in self.trades if trade.open_date
-                 == open_date and trade.is_open][0]
-        trade.is_open = False
-        trade.close_market_price = close_market_price
-        trade.close_price = close_price
-        trade.close_date = close_date
-        trade.close_fees = close_fees
-
-    @classmethod
-    def to_dict(self):
-        trades = list()
-        for trade in Trade.trades:
-            trades.append(
-                {
-                    'symbol': trade.symbol,
-                    'direction': trade.direction,
-                    'open_market_price': trade.open_market_price,
-                    'close_market_price': trade.close_market_price,
-                    'is_open': trade.is_open,
-                    'open_price': trade.open_price,
-                    'open_date': trade.open_date,
-                    'close_price': trade.close_price,
-                    'close_date': trade.close_date,
-                    'indicator': trade.indicators,
-                    'open_fees': trade.open_fees,
-                    'close_fees': trade.close_fees
-                }
-            )
-        return trades
+import pandas as pd
+
+
+class TradeLedger:
+    """
+    TradeLedger records the trades of a single Portfolio, so several backtests can run in the same process.
+    Trades are stored column by column, a trade id being its row, and open trades are indexed by (symbol, trade id).
+    """
+
+    columns = (
+        'symbol',
+        'direction',
+        'open_market_price',
+        'close_market_price',
+        'is_open',
+        'open_price',
+        'open_date',
+        'close_price',
+        'close_date',
+        'indicator',
+        'open_fees',
+        'close_fees'
+    )
+
+    def __init__(self):
+        self.data = dict((column, list()) for column in self.columns)
+        self.open_trades = dict()
+
+    def __len__(self):
+        return len(self.data['symbol'])
+
+    def __repr__(self):
+        return f'<TradeLedger: {len(self)} trades, {len(self.open_trades)} open>'
+
+    def open(self, symbol, direction, open_market_price, open_date, open_price, open_fees, indicators):
+        """
+        It records a new open trade and returns its id
+        """
+        trade_id = len(self)
+
+        row = {
+            'symbol': symbol,
+            'direction': direction,
+            'open_market_price': open_market_price,
+            'close_market_price': None,
+            'is_open': True,
+            'open_price': open_price,
+            'open_date': open_date,
+            'close_price': None,
+            'close_date': None,
+            'indicator': indicators,
+            'open_fees': open_fees,
+            'close_fees': None
+        }
+        for column in self.columns:
+            self.data[column].append(row[column])
+
+        self.open_trades[(symbol, trade_id)] = trade_id
+
+        return trade_id
+
+    def increase(self, symbol, trade_id, open_price, open_fees):
+        """
+        It adds a partial fill to the open trade trade_id of symbol.
+        It raises a KeyError if that trade is not open for that symbol.
+        """
+        row = self.open_trades[(symbol, trade_id)]
+
+        self.data['open_price'][row] += open_price
+        self.data['open_fees'][row] += open_fees
+
+    def close(self, symbol, trade_id, close_market_price, close_date, close_price, close_fees):
+        """
+        It closes the open trade trade_id of symbol.
+        It raises a KeyError if that trade is not open for that symbol.
+        """
+        row = self.open_trades.pop((symbol, trade_id))
+
+        self.data['is_open'][row] = False
+        self.data['close_market_price'][row] = close_market_price
+        self.data['close_date'][row] = close_date
+        self.data['close_price'][row] = close_price
+        self.data['close_fees'][row] = close_fees
+
+    def to_frame(self):
+        """
+        It returns all trades as a DataFrame, built in one shot from the columns
+        """
+        return pd.DataFrame(self.data, columns=self.columns)
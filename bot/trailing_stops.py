@@ -0,0 +1,105 @@
+import numpy as np
+
+from event import SignalEvent
+
+
+class TrailingStops:
+    """
+    TrailingStops keeps the trailing stop-loss of every open position in arrays indexed like symbol_list.
+    All stops are updated in a single vectorized step per bar, and an exit signal is sent for every breached stop.
+
+    A stop starts at pct_sl from the open price. Once the position returns pct_tp, it trails the price at pct_sl,
+    the same rules as helpers.init_trailing_long() and helpers.init_trailing_short().
+    """
+
+    def __init__(self, events, symbol_list, long_exit='EXIT', short_exit='EXITSHORT'):
+        """
+        Parameters:
+            events: The Queue of Event objects.
+            symbol_list: The symbols which can hold a position.
+            long_exit, short_exit: The signal types sent when a long or short stop is breached.
+        """
+        self.events = events
+        self.symbol_list = symbol_list
+        self.exit_signals = {1: long_exit, -1: short_exit}
+
+        self.index = dict((s, i) for i, s in enumerate(self.symbol_list))
+
+        size = len(self.symbol_list)
+        self.is_open = np.zeros(size, dtype=bool)
+        self.direction = np.zeros(size, dtype=np.int8)
+        self.open_price = np.zeros(size)
+        self.stop = np.zeros(size)
+        self.pct_sl = np.zeros(size)
+        self.pct_tp = np.zeros(size)
+
+    def __repr__(self):
+        return f'<TrailingStops: {self.is_open.sum()} open positions>'
+
+    def open(self, symbol, direction, open_price, pct_sl, pct_tp):
+        """
+        It starts tracking the stop of a new 'LONG' or 'SHORT' position
+        """
+        i = self.index[symbol]
+        sign = 1 if direction == 'LONG' else -1
+
+        self.is_open[i] = True
+        self.direction[i] = sign
+        self.open_price[i] = open_price
+        self.stop[i] = open_price * (1 - sign * pct_sl)
+        self.pct_sl[i] = pct_sl
+        self.pct_tp[i] = pct_tp
+
+    def close(self, symbol):
+        """
+        It stops tracking a position closed by another exit rule
+        """
+        self.is_open[self.index[symbol]] = False
+
+    def get_open_price(self, symbol):
+        return self.open_price[self.index[symbol]]
+
+    def get_stop(self, symbol):
+        return self.stop[self.index[symbol]]
+
+    def update(self, prices):
+        """
+        It trails all open stops with the latest prices (ordered like symbol_list) and returns the mask of breached stops
+        """
+        is_long = self.is_open & (self.direction == 1)
+        is_short = self.is_open & (self.direction == -1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.where(is_long, prices / self.open_price,
+                               self.open_price / prices) - 1
+
+        in_profit = returns >= self.pct_tp
+        trailed = prices * (1 - self.direction * self.pct_sl)
+
+        self.stop = np.where(is_long & in_profit,
+                             np.maximum(self.stop, trailed), self.stop)
+        self.stop = np.where(is_short & in_profit,
+                             np.minimum(self.stop, trailed), self.stop)
+
+        return (is_long & (prices <= self.stop)) | (is_short & (prices >= self.stop))
+
+    def check(self, prices, datetime):
+        """
+        It updates all stops and sends an exit SignalEvent for each breached one.
+        Returns the list of symbols exited.
+        """
+        exited = list()
+
+        for i in np.flatnonzero(self.update(prices)):
+            symbol = self.symbol_list[i]
+
+            signal = SignalEvent(
+                symbol=symbol,
+                datetime=datetime,
+                signal_type=self.exit_signals[self.direction[i]]
+            )
+            self.events.put(signal)
+            self.is_open[i] = False
+            exited.append(symbol)
+
+        return exited
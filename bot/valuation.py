@@ -0,0 +1,95 @@
+import re
+
+import numpy as np
+
+
+def split_symbol(symbol):
+    """
+    Returns the base and quote currencies of a symbol, e.g. 'ETH-BTC' or 'ETH/BTC' -> ('ETH', 'BTC')
+    """
+    base, quote = re.split('[-/]', symbol)
+    return base, quote
+
+
+class Valuation:
+    """
+    Valuation converts amounts quoted in the quote currency of each symbol into a single reporting currency,
+    e.g. ETH-BTC and XRP-BTC holdings into USDT through BTC-USDT.
+
+    Each quote currency is converted through one pair, 'QUOTE-CURRENCY' by default or the one set in
+    the 'pairs' config key, inverted when the reporting currency is its base (e.g. USDT -> BTC through BTC-USDT).
+    In backtests, the conversion rates come from a series aligned with the bars, preloaded by the data handler
+    and looked up by bar index. In live, the data handler has no series and the pair current price is used.
+    Without a reporting currency, every rate is 1.
+    """
+
+    def __init__(self, data_handler, currency=None, pairs=None):
+        """
+        Parameters:
+            data_handler: The DataHandler providing the conversion series or prices.
+            currency: The reporting currency, e.g. 'USDT'. None disables the conversion.
+            pairs: Dict of quote currency -> conversion pair, overriding the default pairs.
+        """
+        self.data_handler = data_handler
+        self.symbol_list = self.data_handler.symbol_list
+        self.currency = currency
+
+        # Conversion rate of the quote currency of each symbol, indexed like symbol_list
+        self.rates = np.ones(len(self.symbol_list))
+        self.index = dict((s, i) for i, s in enumerate(self.symbol_list))
+
+        # quote currency -> (pair, inverted, series or None, rows in symbol_list)
+        self.conversions = dict()
+
+        if self.currency is None:
+            return
+
+        pairs = pairs or dict()
+        separator = '/' if '/' in self.symbol_list[0] else '-'
+
+        quotes = [split_symbol(symbol)[1] for symbol in self.symbol_list]
+        for quote in set(quotes):
+            if quote == self.currency:
+                continue
+
+            pair = pairs.get(quote, f'{quote}{separator}{self.currency}')
+            inverted = split_symbol(pair)[0] == self.currency
+            rows = np.array([i for i, q in enumerate(quotes) if q == quote])
+
+            self.conversions[quote] = (
+                pair,
+                inverted,
+                self.data_handler.get_conversion_series(pair),
+                rows
+            )
+
+    def __repr__(self):
+        return f'<Valuation: {self.currency}, {len(self.conversions)} conversions>'
+
+    def update(self):
+        """
+        It sets the conversion rates of the current bar, one lookup per quote currency.
+        A missing rate (NaN, or 0 before the pair was listed) keeps the previous one.
+        """
+        for pair, inverted, series, rows in self.conversions.values():
+            if series is not None:
+                rate = series[self.data_handler.bar_index - 1]
+            else:
+                rate = self.data_handler.current_prices([pair])[0]
+
+            if not rate > 0:
+                continue
+
+            self.rates[rows] = 1 / rate if inverted else rate
+
+    def rate(self, symbol):
+        """
+        It returns the current conversion rate of the quote currency of symbol
+        """
+        return self.rates[self.index[symbol]]
+
+    def convert(self, values):
+        """
+        It converts values quoted like symbol_list (an array) into the reporting currency
+        """
+        return values * self.rates